@@ -4,27 +4,64 @@
 # ------------------------------------------------------------
 
 import os
+import hmac
+import hashlib
+import gzip
 import time
+import asyncio
 import threading
 import ipaddress
 from datetime import datetime
+from dataclasses import dataclass, field
+from collections import Counter, deque
+from itertools import islice
+from functools import lru_cache
 import socket
 import webbrowser
 
 import nmap
 import netifaces
+try:
+    from scapy.all import ARP, Ether, srp
+except ImportError:
+    srp = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
 from flask import (
-    Flask, render_template_string, jsonify,
+    Flask, stream_with_context,
     request, redirect, url_for, session
 )
+from flask.json.provider import JSONProvider
+from werkzeug.security import check_password_hash
 
 # --------------------------- SETTINGS ---------------------------
 SCAN_INTERVAL_SEC = 15       # scanner interval
 COMMON_PORTS = [21, 22, 23, 80, 443, 554, 8080]
+ARP_TIMEOUT_SEC = 2          # wait for ARP replies during host discovery
+PROBE_TIMEOUT_SEC = 0.5      # TCP connect timeout per port probe
+PROBE_CONCURRENCY = 512      # port probes in flight (bounded to avoid FD exhaustion)
+NET_REFRESH_SEC = 300        # re-detect the local network CIDR this often
+SWEEP_INTERVAL_SEC = 120     # force a discovery sweep even if the ARP cache is unchanged
+PORT_RESCAN_SEC = 300        # re-probe a known host's ports this often
+ARP_TABLE = "/proc/net/arp"
+STREAM_RETRY_MS = 4000       # dashboard reconnects to /api/stream after this
 DASH_USER = os.getenv("IOT_IDS_USER", "admin")
 DASH_PASS = os.getenv("IOT_IDS_PASS", "admin123")
+DASH_PASS_HASH = os.getenv("IOT_IDS_PASS_HASH")  # werkzeug hash; overrides IOT_IDS_PASS
 SECRET_KEY = os.getenv("IOT_IDS_SECRET", "change-me-please")
 
+# nmap timing: skips the slow congestion ramp-up on a quiet LAN. On lossy WiFi
+# a dropped probe is not retried much, so raise the retries if ports go missing.
+NMAP_MIN_RATE = int(os.getenv("IOT_IDS_NMAP_MIN_RATE", "5000"))
+NMAP_MAX_RETRIES = int(os.getenv("IOT_IDS_NMAP_MAX_RETRIES", "1"))
+NMAP_TIMING_ARGS = f"--min-rate {NMAP_MIN_RATE} --max-retries {NMAP_MAX_RETRIES}"
+
 VULN_HINTS = {
     21:  ("HIGH",   "FTP (21) — plaintext auth; disable or enforce TLS."),
     22:  ("INFO",   "SSH (22) — strong password/keys recommended."),
@@ -34,17 +71,98 @@ VULN_HINTS = {
     554: ("MEDIUM", "RTSP (554) — ensure stream auth/firmware updated."),
     8080:("MEDIUM", "Alt HTTP (8080) — often admin UI; require auth.")
 }
+FORMATTED_VULNS = {p: f"[{sev}] {msg}" for p, (sev, msg) in VULN_HINTS.items()}
 
 # --------------------------- GLOBAL STATE -----------------------
-devices = {}
-device_count_history = []
+@dataclass
+class DeviceTable:
+    """Known devices stored column-wise; row i of every list is one device."""
+    ips: list = field(default_factory=list)
+    macs: list = field(default_factory=list)
+    vendors: list = field(default_factory=list)
+    open_ports: list = field(default_factory=list)
+    vulns: list = field(default_factory=list)
+    last_seen_ts: list = field(default_factory=list)
+    last_seen_str: list = field(default_factory=list)
+    ip_to_idx: dict = field(default_factory=dict)
+
+    COLUMNS = ("ips", "macs", "vendors", "open_ports", "vulns",
+               "last_seen_ts", "last_seen_str")
+
+    def __len__(self):
+        return len(self.ips)
+
+    def upsert(self, ip, mac, vendor, open_ports, vulns, seen_ts, seen_str):
+        i = self.ip_to_idx.get(ip)
+        if i is None:
+            self.ip_to_idx[ip] = len(self.ips)
+            self.ips.append(ip)
+            self.macs.append(mac)
+            self.vendors.append(vendor)
+            self.open_ports.append(open_ports)
+            self.vulns.append(vulns)
+            self.last_seen_ts.append(seen_ts)
+            self.last_seen_str.append(seen_str)
+            return
+        if mac and mac != self.macs[i]:
+            # a different MAC on the same IP is a different device
+            self.macs[i] = mac
+            self.vendors[i] = vendor
+        elif vendor and not self.vendors[i]:
+            self.vendors[i] = vendor
+        self.open_ports[i] = open_ports
+        self.vulns[i] = vulns
+        self.last_seen_ts[i] = seen_ts
+        self.last_seen_str[i] = seen_str
+
+    def copy(self):
+        # shallow: per-device port/finding lists are replaced, never mutated
+        return DeviceTable(*(list(getattr(self, name)) for name in self.COLUMNS),
+                           ip_to_idx=dict(self.ip_to_idx))
+
+    def prune(self, cutoff_ts: float, keep: set):
+        """Drop devices not in `keep` that were last seen before `cutoff_ts`."""
+        live = [i for i, (ip, ts) in enumerate(zip(self.ips, self.last_seen_ts))
+                if ip in keep or ts >= cutoff_ts]
+        if len(live) == len(self.ips):
+            return
+        for name in self.COLUMNS:
+            col = getattr(self, name)
+            setattr(self, name, [col[i] for i in live])
+        self.ip_to_idx = {ip: i for i, ip in enumerate(self.ips)}
+
+devices = DeviceTable()
+device_count_history = deque(maxlen=200)  # ring buffer, touched by scan_once only
+history_window = []          # last 60 counts, published for the handlers
 network_cidr = "0.0.0.0/0"
-lock = threading.Lock()
+scan_version = 0             # bumped after every completed scan
+BOOT_ID = f"{int(time.time()):x}"
+_summary_cache = (None, b"", b"")  # (scan_version, /api/summary body, gzipped body)
+_net_cache = {"cidr": None, "t": 0.0}
+_verified_pass = set()
+_last_arp = None             # ARP cache as of the last sweep
+_last_sweep = 0.0
+_last_port_scan = {}         # ip -> monotonic time of its last port probe
 
 # --------------------------- FLASK APP --------------------------
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
 
+class UjsonProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return ujson.dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return ujson.loads(s)
+
+# every jsonify()/app.json call goes through ujson when it is installed;
+# otherwise at least skip the key sorting and pretty-printing
+if ujson is not None:
+    app.json = UjsonProvider(app)
+else:
+    app.json.sort_keys = False
+    app.json.compact = True
+
 def login_required(f):
     from functools import wraps
     @wraps(f)
@@ -54,41 +172,71 @@ def login_required(f):
         return f(*args, **kwargs)
     return _wrap
 
+def check_dash_password(p: str) -> bool:
+    if not DASH_PASS_HASH:
+        return hmac.compare_digest(p.encode(), DASH_PASS.encode())
+    # remember a keyed digest (never the plaintext) of a password once it has
+    # verified, so dashboard re-logins skip the slow hash check
+    key = hmac.new(SECRET_KEY.encode(), p.encode(), hashlib.sha256).digest()
+    if key in _verified_pass:
+        return True
+    if check_password_hash(DASH_PASS_HASH, p):
+        _verified_pass.add(key)
+        return True
+    return False
+
+def dumps_json(obj) -> bytes:
+    # orjson is several times faster than the stdlib encoder for the summary
+    # payload; OPT_NON_STR_KEYS covers the int port keys in vuln_ports
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return app.json.dumps(obj, separators=(",", ":")).encode()
+
 # ------------------------ NETWORK HELPERS -----------------------
-def get_local_network() -> str:
+def _detect_local_network():
     try:
         gws = netifaces.gateways()
         if 'default' not in gws or netifaces.AF_INET not in gws['default']:
-            return "192.168.1.0/24"
+            return None
         iface = gws['default'][netifaces.AF_INET][1]
         addrs = netifaces.ifaddresses(iface).get(netifaces.AF_INET, [{}])[0]
         ip = addrs.get('addr')
         netmask = addrs.get('netmask')
         if not ip or not netmask:
-            return "192.168.1.0/24"
+            return None
         network = ipaddress.IPv4Network(f"{ip}/{netmask}", strict=False)
         return str(network)
     except Exception:
-        return "192.168.1.0/24"
+        return None
 
-def scan_once():
-    global devices, device_count_history, network_cidr
+def get_local_network() -> str:
+    # the CIDR practically never changes at runtime; re-detect it every
+    # NET_REFRESH_SEC, and keep the last good value if detection fails
+    t = time.monotonic()
+    if _net_cache["cidr"] and t - _net_cache["t"] < NET_REFRESH_SEC:
+        return _net_cache["cidr"]
+    cidr = _detect_local_network()
+    if cidr:
+        _net_cache["cidr"] = cidr
+        _net_cache["t"] = t
+        return cidr
+    return _net_cache["cidr"] or "192.168.1.0/24"
+
+def arp_sweep(cidr: str) -> dict:
+    ans, _ = srp(Ether(dst="ff:ff:ff:ff:ff:ff") / ARP(pdst=cidr),
+                 timeout=ARP_TIMEOUT_SEC, verbose=0)
+    return {r.psrc: (r.hwsrc.upper(), None) for _, r in ans}
+
+def nmap_sweep(cidr: str) -> dict:
     nm = nmap.PortScanner()
-    local_cidr = get_local_network()
-    now = datetime.now()
-    try:
-        nm.scan(hosts=local_cidr, arguments='-sn -n')
-    except Exception:
-        return
-
-    seen_ips = set()
+    nm.scan(hosts=cidr, arguments=f'-sn -n {NMAP_TIMING_ARGS}')
+    found = {}
     for host in nm.all_hosts():
         try:
             if nm[host].state() != "up":
                 continue
         except KeyError:
             continue
-        seen_ips.add(host)
 
         mac = None
         vendor = None
@@ -98,52 +246,135 @@ def scan_once():
                 vendor = nm[host].get('vendor', {}).get(mac)
         except Exception:
             pass
-
-        open_ports = []
+        found[host] = (mac, vendor)
+    return found
+
+def discover_hosts(cidr: str) -> dict:
+    """Return {ip: (mac, vendor)} for live hosts on `cidr`."""
+    # a raw ARP broadcast answers in one round-trip; nmap is only needed when
+    # scapy is missing or we lack raw-socket rights
+    if srp is not None:
         try:
-            nm.scan(hosts=host, arguments='-Pn -n -T4 -p ' + ",".join(map(str, COMMON_PORTS)))
-            for proto in nm[host].all_protocols():
-                for port, meta in nm[host][proto].items():
-                    if meta.get('state') == 'open':
-                        open_ports.append(int(port))
+            return arp_sweep(cidr)
         except Exception:
             pass
-        open_ports = sorted(set(open_ports))
-
-        vulns = []
-        for p in open_ports:
-            if p in VULN_HINTS:
-                sev, msg = VULN_HINTS[p]
-                vulns.append(f"[{sev}] {msg}")
-
-        with lock:
-            rec = devices.get(host, {
-                "ip": host,
-                "mac": mac,
-                "vendor": vendor,
-                "open_ports": [],
-                "vulns": [],
-                "last_seen": now
-            })
-            if mac and not rec.get("mac"):
-                rec["mac"] = mac
-            if vendor and not rec.get("vendor"):
-                rec["vendor"] = vendor
-            rec["open_ports"] = open_ports
-            rec["vulns"] = vulns
-            rec["last_seen"] = now
-            devices[host] = rec
-
-    with lock:
-        network_cidr = local_cidr
-        cutoff = now.timestamp() - (SCAN_INTERVAL_SEC * 3)
-        stale_ips = [ip for ip, rec in devices.items()
-                     if rec["last_seen"].timestamp() < cutoff and ip not in seen_ips]
-        for ip in stale_ips:
-            del devices[ip]
-        device_count_history.append(len(devices))
-        if len(device_count_history) > 200:
-            device_count_history = device_count_history[-200:]
+    return nmap_sweep(cidr)
+
+def read_arp(cidr: str):
+    """Return {ip: mac} from the kernel ARP cache for `cidr`, or None if unavailable."""
+    try:
+        with open(ARP_TABLE) as fh:
+            lines = fh.read().splitlines()[1:]
+    except OSError:
+        return None
+    net = ipaddress.IPv4Network(cidr, strict=False)
+    entries = {}
+    for line in lines:
+        parts = line.split()
+        # flag 0x2 = completed entry; incomplete ones have no usable MAC
+        if len(parts) < 4 or not int(parts[2], 16) & 0x2:
+            continue
+        try:
+            if ipaddress.IPv4Address(parts[0]) not in net:
+                continue
+        except ValueError:
+            continue
+        entries[parts[0]] = parts[3].upper()
+    return entries
+
+async def probe(ip: str, port: int, sem) -> bool:
+    async with sem:
+        try:
+            _, w = await asyncio.wait_for(asyncio.open_connection(ip, port), PROBE_TIMEOUT_SEC)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        w.close()
+        return True
+
+async def probe_hosts(hosts: list) -> dict:
+    """TCP-connect every COMMON_PORTS on every host; returns {ip: set(open_ports)}."""
+    # a plain connect() is enough to tell "open" for a handful of ports, and the
+    # whole hosts x ports sweep finishes in about one PROBE_TIMEOUT_SEC
+    sem = asyncio.Semaphore(PROBE_CONCURRENCY)
+    pairs = [(h, p) for h in hosts for p in COMMON_PORTS]
+    results = await asyncio.gather(*(probe(h, p, sem) for h, p in pairs))
+    found = {h: set() for h in hosts}
+    for (h, p), is_open in zip(pairs, results):
+        if is_open:
+            found[h].add(p)
+    return found
+
+def scan_once():
+    global devices, history_window, network_cidr, scan_version, _last_arp, _last_sweep
+    local_cidr = get_local_network()
+    now = datetime.now()
+    now_ts = now.timestamp()
+    now_str = now.strftime("%Y-%m-%d %H:%M:%S")
+    t = time.monotonic()
+
+    # the kernel ARP cache is a cheap dirty bit: while it is unchanged and a
+    # sweep ran recently, nothing joined or left, so the sweep is skipped
+    arp = read_arp(local_cidr)
+    swept = (arp is None or arp != _last_arp or local_cidr != network_cidr
+             or t - _last_sweep >= SWEEP_INTERVAL_SEC)
+    if swept:
+        try:
+            host_meta = discover_hosts(local_cidr)
+        except Exception:
+            return
+        _last_sweep = t
+        _last_arp = read_arp(local_cidr)  # the sweep itself refreshes the cache
+    else:
+        host_meta = {ip: (mac, None) for ip, mac in arp.items()}
+    seen_ips = set(host_meta)
+
+    # only probe hosts that are new, show a different MAC, or were last
+    # probed more than PORT_RESCAN_SEC ago; the rest keep their known ports
+    prev = devices
+    due = []
+    for host, (mac, _) in host_meta.items():
+        i = prev.ip_to_idx.get(host)
+        last = _last_port_scan.get(host)
+        if (i is None or last is None or t - last >= PORT_RESCAN_SEC
+                or (mac and prev.macs[i] and mac != prev.macs[i])):
+            due.append(host)
+    open_ports_by_host = asyncio.run(probe_hosts(sorted(due))) if due else {}
+    for host in due:
+        _last_port_scan[host] = t
+
+    # scan_once is the only writer: build the next state privately and publish
+    # it by rebinding the globals, so readers never need a lock. scan_version
+    # is bumped last and readers load it first, so a reader that sees the new
+    # version also sees the new table.
+    tbl = prev.copy()
+    for host, (mac, vendor) in host_meta.items():
+        if host in open_ports_by_host:
+            open_ports = sorted(open_ports_by_host[host])
+            vulns = vulns_for_ports(tuple(open_ports))
+        else:
+            i = tbl.ip_to_idx[host]
+            open_ports = tbl.open_ports[i]
+            vulns = tbl.vulns[i]
+
+        tbl.upsert(host, mac, vendor, open_ports, vulns, now_ts, now_str)
+    # without a sweep we have not looked for absent hosts, so only prune after one
+    if swept:
+        tbl.prune(now_ts - (SCAN_INTERVAL_SEC * 3), seen_ips)
+        for ip in [ip for ip in _last_port_scan if ip not in tbl.ip_to_idx]:
+            del _last_port_scan[ip]
+
+    devices = tbl
+    device_count_history.append(len(tbl))
+    history_window = list(islice(device_count_history,
+                                 max(0, len(device_count_history) - 60), None))
+    network_cidr = local_cidr
+    scan_version += 1
+
+@lru_cache(maxsize=1024)
+def vulns_for_ports(ports: tuple) -> tuple:
+    # most devices keep the same open ports scan after scan, so the findings
+    # tuple is built once per distinct port set and shared between records
+    return tuple(FORMATTED_VULNS[p] for p in ports if p in FORMATTED_VULNS)
 
 def background_scanner():
     while True:
@@ -166,12 +397,14 @@ def login():
     if request.method == "POST":
         u = request.form.get("username", "")
         p = request.form.get("password", "")
-        if u == DASH_USER and p == DASH_PASS:
+        user_ok = hmac.compare_digest(u.encode(), DASH_USER.encode())
+        pass_ok = check_dash_password(p)
+        if user_ok and pass_ok:
             session["authed"] = True
             nxt = request.args.get("next") or url_for("dashboard")
             return redirect(nxt)
         err = "Invalid credentials"
-    return render_template_string(LOGIN_HTML, error=err, username_hint=DASH_USER)
+    return LOGIN_TMPL.render(error=err, username_hint=DASH_USER)
 
 @app.route("/logout")
 def logout():
@@ -181,41 +414,96 @@ def logout():
 @app.route("/dashboard")
 @login_required
 def dashboard():
-    return render_template_string(DASHBOARD_HTML)
+    return DASHBOARD_TMPL.render()
+
+def device_columns(tbl):
+    return zip(tbl.ips, tbl.macs, tbl.vendors, tbl.open_ports, tbl.vulns, tbl.last_seen_str)
+
+def device_row(ip, mac, vendor, ports, vulns, seen):
+    return {
+        "ip": ip,
+        "mac": mac or "Unknown",
+        "vendor": vendor or "Unknown",
+        "open_ports": ports,
+        "vulns": vulns,
+        "last_seen": seen
+    }
+
+def summary_meta(tbl, cidr, history):
+    # everything in the summary except the per-device rows
+    total = len(tbl)
+    vulnerable = sum(1 for v in tbl.vulns if v)
+    port_tally = Counter(p for ports in tbl.open_ports for p in ports if p in VULN_HINTS)
+    return {
+        "network": cidr,
+        "total": total,
+        "safe": total - vulnerable,
+        "vulnerable": vulnerable,
+        "history": history,
+        "vuln_ports": port_tally
+    }
+
+def summary_headers(resp, etag):
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
 
 @app.route("/api/summary")
 @login_required
 def api_summary():
-    with lock:
-        total = len(devices)
-        vulnerable = 0
-        port_tally = {}
-        rows = []
-        for ip, rec in devices.items():
-            is_vuln = 1 if rec["vulns"] else 0
-            vulnerable += is_vuln
-            for p in rec["open_ports"]:
-                if p in VULN_HINTS:
-                    port_tally[p] = port_tally.get(p, 0) + 1
-            rows.append({
-                "ip": ip,
-                "mac": rec["mac"] or "Unknown",
-                "vendor": rec["vendor"] or "Unknown",
-                "open_ports": rec["open_ports"],
-                "vulns": rec["vulns"],
-                "last_seen": rec["last_seen"].strftime("%Y-%m-%d %H:%M:%S")
-            })
-
-        safe = total - vulnerable
-        return jsonify({
-            "network": network_cidr,
-            "total": total,
-            "safe": safe,
-            "vulnerable": vulnerable,
-            "history": device_count_history[-60:],
-            "vuln_ports": port_tally,
-            "devices": rows
-        })
+    global _summary_cache
+    # published state is never mutated, so local references are a consistent
+    # snapshot; see scan_once for the ordering that makes this safe
+    version = scan_version
+    cached = _summary_cache
+    snap = devices
+    snap_cidr = network_cidr
+    snap_history = history_window
+
+    # the gzip body is a different representation, so it gets its own strong tag
+    use_gzip = bool(request.accept_encodings["gzip"])
+    etag = f"{BOOT_ID}-{version}" + ("-gz" if use_gzip else "")
+    # the payload only changes once per scan, so most polls are a 304
+    if request.if_none_match.contains(etag):
+        return summary_headers(app.response_class(status=304), etag)
+
+    if cached[0] != version:
+        payload = summary_meta(snap, snap_cidr, snap_history)
+        payload["devices"] = [device_row(*r) for r in device_columns(snap)]
+        body = dumps_json(payload)
+        # the rows repeat the same keys, so gzip shrinks the body several
+        # times over; compress once per scan, not once per request
+        cached = _summary_cache = (version, body, gzip.compress(body, 6))
+
+    if use_gzip:
+        resp = app.response_class(cached[2], mimetype="application/json")
+        resp.headers["Content-Encoding"] = "gzip"
+    else:
+        resp = app.response_class(cached[1], mimetype="application/json")
+    return summary_headers(resp, etag)
+
+@app.route("/api/stream")
+@login_required
+def api_stream():
+    # server-sent events: a "meta" event with the counters/charts, then one
+    # message per device row, so the table fills in as rows arrive. The
+    # stream ends after one snapshot and the browser reconnects after
+    # `retry` ms, which stands in for the old polling interval.
+    snap = devices
+    snap_cidr = network_cidr
+    snap_history = history_window
+    meta = summary_meta(snap, snap_cidr, snap_history)
+
+    def gen():
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        yield f"event: meta\ndata: {dumps_json(meta).decode()}\n\n"
+        for r in device_columns(snap):
+            yield f"data: {dumps_json(device_row(*r)).decode()}\n\n"
+
+    resp = app.response_class(stream_with_context(gen()), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
 
 # --------------------------- HTML -------------------------------
 LOGIN_HTML = """
@@ -328,54 +616,57 @@ DASHBOARD_HTML = """
   <script>
     let pie, line, bar;
     function sevClass(txt){ const m = txt.match(/^\\[(.*?)\\]/); return m ? ("sev-" + m[1]) : ""; }
-    function renderTable(devs){
-      const tb = document.querySelector("#tbl tbody");
-      tb.innerHTML = "";
-      devs.forEach(d=>{
-        const tr = document.createElement("tr");
-        const vulnsHtml = (d.vulns && d.vulns.length)
-          ? d.vulns.map(v=>`<div class="${sevClass(v)}">${v}</div>`).join("")
-          : '<span class="sev-INFO">[OK] No risky ports detected</span>';
-        tr.innerHTML = `
-          <td>${d.ip}</td>
-          <td>${d.mac}</td>
-          <td>${d.vendor}</td>
-          <td>${(d.open_ports||[]).join(", ") || "-"}</td>
-          <td>${vulnsHtml}</td>
-          <td>${d.last_seen}</td>
-        `;
-        tb.appendChild(tr);
-      });
+    function appendRow(tb, d){
+      const tr = document.createElement("tr");
+      const vulnsHtml = (d.vulns && d.vulns.length)
+        ? d.vulns.map(v=>`<div class="${sevClass(v)}">${v}</div>`).join("")
+        : '<span class="sev-INFO">[OK] No risky ports detected</span>';
+      tr.innerHTML = `
+        <td>${d.ip}</td>
+        <td>${d.mac}</td>
+        <td>${d.vendor}</td>
+        <td>${(d.open_ports||[]).join(", ") || "-"}</td>
+        <td>${vulnsHtml}</td>
+        <td>${d.last_seen}</td>
+      `;
+      tb.appendChild(tr);
     }
-    async function fetchSummary(){ const r = await fetch('/api/summary'); return await r.json(); }
     function ensureCharts(){
       if(!pie){ pie = new Chart(document.getElementById('pie'), { type:'pie', data:{ labels:['Safe','Vulnerable'], datasets:[{ data:[0,0] }] } }); }
       if(!line){ line = new Chart(document.getElementById('line'), { type:'line', data:{ labels:[], datasets:[{ label:'Devices Online', data:[], fill:false }] } }); }
       if(!bar){ bar = new Chart(document.getElementById('bar'), { type:'bar', data:{ labels:[], datasets:[{ label:'Devices with risky port', data:[] }] } }); }
     }
-    async function tick(){
-      try{
-        const s = await fetchSummary();
-        document.getElementById('net').textContent = s.network;
-        document.getElementById('tot').textContent = s.total;
-        document.getElementById('safe').textContent = s.safe;
-        document.getElementById('vuln').textContent = s.vulnerable;
-        renderTable(s.devices);
-        ensureCharts();
-        pie.data.datasets[0].data = [s.safe, s.vulnerable]; pie.update();
-        line.data.labels = Array.from({length: s.history.length}, (_,i)=> String(i+1));
-        line.data.datasets[0].data = s.history; line.update();
-        const ports = Object.keys(s.vuln_ports);
-        const counts = Object.values(s.vuln_ports);
-        bar.data.labels = ports; bar.data.datasets[0].data = counts; bar.update();
-      }catch(e){ }
+    function renderMeta(s){
+      document.getElementById('net').textContent = s.network;
+      document.getElementById('tot').textContent = s.total;
+      document.getElementById('safe').textContent = s.safe;
+      document.getElementById('vuln').textContent = s.vulnerable;
+      ensureCharts();
+      pie.data.datasets[0].data = [s.safe, s.vulnerable]; pie.update();
+      line.data.labels = Array.from({length: s.history.length}, (_,i)=> String(i+1));
+      line.data.datasets[0].data = s.history; line.update();
+      const ports = Object.keys(s.vuln_ports);
+      const counts = Object.values(s.vuln_ports);
+      bar.data.labels = ports; bar.data.datasets[0].data = counts; bar.update();
     }
-    setInterval(tick, 4000); tick();
+    const tbody = document.querySelector("#tbl tbody");
+    const stream = new EventSource('/api/stream');
+    stream.addEventListener('meta', e=>{
+      tbody.innerHTML = "";
+      try{ renderMeta(JSON.parse(e.data)); }catch(err){ }
+    });
+    stream.onmessage = e=>{
+      try{ appendRow(tbody, JSON.parse(e.data)); }catch(err){ }
+    };
   </script>
 </body>
 </html>
 """
 
+# compiled once; the HTML is constant, so there is nothing to re-parse per request
+LOGIN_TMPL = app.jinja_env.from_string(LOGIN_HTML)
+DASHBOARD_TMPL = app.jinja_env.from_string(DASHBOARD_HTML)
+
 # --------------------------- MAIN -------------------------------
 if __name__ == "__main__":
     t = threading.Thread(target=background_scanner, daemon=True)
@@ -383,19 +674,27 @@ if __name__ == "__main__":
 
     host = "0.0.0.0"
     port = 5000
-    while True:
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.bind((host, port))
-            s.close()
-            break
-        except OSError:
-            print(f"Port {port} busy, trying next port...")
-            port += 1
+    # one bind attempt on the preferred port; if it is taken, let the OS hand
+    # out a free one (port 0) instead of walking up port by port
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        s.bind((host, port))
+    except OSError:
+        print(f"Port {port} busy, picking a free port...")
+        s.bind((host, 0))
+        port = s.getsockname()[1]
+    s.close()
 
     url = f"http://localhost:{port}"
     print(f"[*] Dashboard running on {url}")
     try: webbrowser.open(url)
     except Exception: pass
 
-    app.run(host=host, port=port, debug=False)
+    # Werkzeug's dev server is not meant for several dashboards polling at once
+    try:
+        from waitress import serve
+    except ImportError:
+        app.run(host=host, port=port, debug=False, threaded=True)
+    else:
+        serve(app, host=host, port=port, threads=8, ident=None)
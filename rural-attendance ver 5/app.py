@@ -1,36 +1,56 @@
+from datetime import date as _date
 from functools import wraps
 import os
-from flask import Flask, render_template, request, redirect, url_for, session, flash, abort
+import re
+from flask import Flask, render_template, request, redirect, url_for, session, flash, abort, g
 from werkzeug.security import check_password_hash
 from db import (
-    bootstrap, get_user_by_login,
+    bootstrap, close_conn, get_user_by_login,
     # Schools/classes/sections/teachers
     list_schools, insert_school, get_school, update_school, deactivate_school,
-    list_classes_by_school, insert_class, get_class,
+    list_classes_by_school, insert_class, get_class, get_class_with_periods,
     list_sections_by_class, insert_section, list_sections_with_class_by_school,
     list_teachers, insert_teacher, get_teacher, update_teacher, deactivate_teacher,
+    # Students
+    list_students_by_section, insert_student, get_student, update_student, deactivate_student,
     # Subjects
     list_subjects_by_school, insert_subject, get_subject, update_subject, deactivate_subject,
     # Periods
     list_periods_by_school, insert_period, get_period, update_period, deactivate_period,
     # Assignments
-    list_assignments, insert_assignment, deactivate_assignment
-    
-)
-from db import (
-    # ... your existing imports ...
-    list_students_by_section, insert_student, get_student, update_student, deactivate_student
+    list_assignments, insert_assignment, deactivate_assignment,
+    # Attendance
+    get_or_create_attendance_session, bulk_upsert_attendance_marks,
+    load_mark_page, load_daily_report,
 )
 
-from db import (
-    # ...existing...
-    list_periods_by_school, list_sections_by_class, get_class, list_students_by_section,
-    get_or_create_attendance_session, list_students_with_mark, upsert_attendance_mark,
-    summarize_attendance_for_class_date
-)
+# ---------- Request-scoped read cache ----------
+def _cached(fn):
+    # Memoize a read helper for the rest of the current request, keyed on its args,
+    # so form handlers that re-render on errors don't repeat the same SELECTs.
+    @wraps(fn)
+    def wrapper(*args):
+        cache = g.setdefault("_qcache", {})
+        key = (fn.__name__, args)
+        if key not in cache:
+            cache[key] = fn(*args)
+        return cache[key]
+    return wrapper
+
+list_schools = _cached(list_schools)
+list_teachers = _cached(list_teachers)
+list_subjects_by_school = _cached(list_subjects_by_school)
+list_sections_with_class_by_school = _cached(list_sections_with_class_by_school)
+list_periods_by_school = _cached(list_periods_by_school)
 
 app = Flask(__name__)
-app.config.update(TEMPLATES_AUTO_RELOAD=True)
+# Templates are fixed at deploy time: skip the per-render mtime check, keep every
+# compiled template (the set is small), and compile them all once at startup.
+app.config.update(TEMPLATES_AUTO_RELOAD=os.getenv("TEMPLATES_AUTO_RELOAD") == "1")
+app.jinja_env.auto_reload = app.config["TEMPLATES_AUTO_RELOAD"]
+app.jinja_env.cache = {}
+for _tmpl in app.jinja_env.list_templates(extensions=["html"]):
+    app.jinja_env.get_template(_tmpl)
 
 APP_NAME = "Rural Schools Attendance Monitoring System"
 APP_VERSION = "v0.3.9"
@@ -39,9 +59,17 @@ APP_DATE = "2025-09-18"
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "dev-secret-change-me")
 bootstrap()
 
+@app.teardown_appcontext
+def _close_db(exc):
+    # One SQLite connection per request; release it once the response is done.
+    close_conn()
+
 # ---------- Auth helpers ----------
 def current_user():
-    return session.get("user")
+    # Session user, resolved once per request (decorators, views and templates all ask)
+    if "user" not in g:
+        g.user = session.get("user")
+    return g.user
 
 def login_required(f):
     @wraps(f)
@@ -66,6 +94,19 @@ def role_required(*roles):
         return wrapper
     return decorator
 
+# ---------- Form helpers ----------
+def _sf(name, *, lower=False):
+    # Stripped form field ("" when missing)
+    v = request.form.get(name)
+    if not v:
+        return ""
+    v = v.strip()
+    return v.lower() if lower else v
+
+def _of(name):
+    # Stripped optional form field (None when missing/blank)
+    return _sf(name) or None
+
 @app.context_processor
 def inject_globals():
     return dict(
@@ -101,7 +142,7 @@ def index():
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
-        login_id = (request.form.get("login_id") or "").strip()
+        login_id = _sf("login_id")
         password = request.form.get("password") or ""
         if not login_id or not password:
             return render_template("login.html", error="Login ID and Password are required.")
@@ -109,7 +150,7 @@ def login():
         if not row or not check_password_hash(row["password_hash"], password):
             return render_template("login.html", error="Invalid credentials.")
         role = (row["role"] or "").title()
-        session["user"] = {"login_id": row["login_id"], "role": role}
+        session["user"] = g.user = {"login_id": row["login_id"], "role": role}
         target = "dashboard_admin" if role == "Admin" else "dashboard_teacher" if role == "Teacher" else "dashboard_student"
         flash("Signed in successfully.", "success")
         return redirect(url_for(target))
@@ -118,6 +159,7 @@ def login():
 @app.route("/logout")
 def logout():
     session.clear()
+    g.pop("user", None)
     flash("Signed out.", "info")
     return redirect(url_for("index"))
 
@@ -160,10 +202,10 @@ def admin_schools_list():
 @role_required("Admin")
 def admin_schools_new():
     if request.method == "POST":
-        name = (request.form.get("name") or "").strip()
-        address = (request.form.get("address") or "").strip()
-        state = (request.form.get("state") or "").strip()
-        district = (request.form.get("district") or "").strip()
+        name = _sf("name")
+        address = _sf("address")
+        state = _sf("state")
+        district = _sf("district")
         if not name:
             return render_template("admin_schools_new.html", error="School name is required.")
         ok = insert_school(name, address or None, state or None, district or None)
@@ -196,12 +238,13 @@ def admin_classes_new(school_id):
         flash("School not found.", "error")
         return redirect(url_for("admin_schools_list"))
     if request.method == "POST":
-        name = (request.form.get("name") or "").strip()
+        name = _sf("name")
         if not name:
             return render_template("admin_classes_new.html", school=school, error="Class name is required.")
         ok = insert_class(school_id, name)
         if not ok:
-            return render_template("admin_classes_new.html", school=school, error="This class already exists for the school.")
+            return render_template("admin_classes_new.html", school=school,
+                                   error="School not found." if ok is None else "This class already exists for the school.")
         flash("Class added.", "success")
         return redirect(url_for("admin_classes_list", school_id=school_id))
     return render_template("admin_classes_new.html", school=school)
@@ -227,12 +270,13 @@ def admin_sections_new(class_id):
         flash("Class not found.", "error")
         return redirect(url_for("admin_schools_list"))
     if request.method == "POST":
-        name = (request.form.get("name") or "").strip()
+        name = _sf("name")
         if not name:
             return render_template("admin_sections_new.html", cls=cls, error="Section name is required.")
         ok = insert_section(class_id, name)
         if not ok:
-            return render_template("admin_sections_new.html", cls=cls, error="This section already exists for the class.")
+            return render_template("admin_sections_new.html", cls=cls,
+                                   error="Class not found." if ok is None else "This section already exists for the class.")
         flash("Section added.", "success")
         return redirect(url_for("admin_sections_list", class_id=class_id))
     return render_template("admin_sections_new.html", cls=cls)
@@ -271,14 +315,14 @@ def admin_students_new(class_id, section_id):
         return redirect(url_for("admin_sections_list", class_id=class_id))
 
     if request.method == "POST":
-        name = (request.form.get("name") or "").strip()
+        name = _sf("name")
         roll_no = request.form.get("roll_no", type=int)
-        admission_no = (request.form.get("admission_no") or "").strip() or None
-        dob = (request.form.get("dob") or "").strip() or None
-        gender = (request.form.get("gender") or "").strip() or None
-        guardian_name = (request.form.get("guardian_name") or "").strip() or None
-        guardian_phone = (request.form.get("guardian_phone") or "").strip() or None
-        address = (request.form.get("address") or "").strip() or None
+        admission_no = _of("admission_no")
+        dob = _of("dob")
+        gender = _of("gender")
+        guardian_name = _of("guardian_name")
+        guardian_phone = _of("guardian_phone")
+        address = _of("address")
 
         if not name:
             return render_template("admin_students_new.html", cls=cls, sec=sec,
@@ -291,7 +335,8 @@ def admin_students_new(class_id, section_id):
         )
         if not ok:
             return render_template("admin_students_new.html", cls=cls, sec=sec,
-                                   error="Duplicate Roll No in this section or Admission No in this school.")
+                                   error=("Class or section not found." if ok is None else
+                                          "Duplicate Roll No in this section or Admission No in this school."))
         flash("Student added.", "success")
         return redirect(url_for("admin_students_list", class_id=class_id, section_id=section_id))
 
@@ -311,14 +356,14 @@ def admin_students_edit(student_id):
     sec = next((s for s in secs if s["id"] == st["section_id"]), None)
 
     if request.method == "POST":
-        name = (request.form.get("name") or "").strip()
+        name = _sf("name")
         roll_no = request.form.get("roll_no", type=int)
-        admission_no = (request.form.get("admission_no") or "").strip() or None
-        dob = (request.form.get("dob") or "").strip() or None
-        gender = (request.form.get("gender") or "").strip() or None
-        guardian_name = (request.form.get("guardian_name") or "").strip() or None
-        guardian_phone = (request.form.get("guardian_phone") or "").strip() or None
-        address = (request.form.get("address") or "").strip() or None
+        admission_no = _of("admission_no")
+        dob = _of("dob")
+        gender = _of("gender")
+        guardian_name = _of("guardian_name")
+        guardian_phone = _of("guardian_phone")
+        address = _of("address")
 
         if not name:
             return render_template("admin_students_edit.html", st=st, cls=cls, sec=sec,
@@ -328,6 +373,9 @@ def admin_students_edit(student_id):
             student_id, name, roll_no, admission_no, dob, gender,
             guardian_name, guardian_phone, address
         )
+        if not ok and not get_student(student_id):
+            flash("Student not found.", "error")
+            return redirect(url_for("admin_students_list", class_id=st["class_id"], section_id=st["section_id"]))
         if not ok:
             return render_template("admin_students_edit.html", st=st, cls=cls, sec=sec,
                                    error="Duplicate Roll No in this section or Admission No in this school.")
@@ -365,7 +413,6 @@ def admin_teachers_list():
 @login_required
 @role_required("Admin")
 def admin_teachers_new():
-    from db import list_schools, insert_teacher  # local import to avoid circulars in some setups
     schools = list_schools()
     if not schools:
         flash("Create a school first.", "error")
@@ -373,15 +420,18 @@ def admin_teachers_new():
 
     if request.method == "POST":
         school_id = request.form.get("school_id", type=int)
-        name = (request.form.get("name") or "").strip()
-        email = (request.form.get("email") or "").strip().lower()
-        phone = (request.form.get("phone") or "").strip() or None
+        name = _sf("name")
+        email = _sf("email", lower=True)
+        phone = _of("phone")
 
         if not (school_id and name and email):
             return render_template("admin_teachers_new.html", schools=schools,
                                    error="School, Name, and Email are required.")
 
         ok = insert_teacher(school_id, name, email, phone)
+        if ok is None:
+            return render_template("admin_teachers_new.html", schools=schools,
+                                   error="The selected school does not exist.")
         if not ok:
             return render_template("admin_teachers_new.html", schools=schools,
                                    error="A teacher with this email already exists.")
@@ -396,7 +446,6 @@ def admin_teachers_new():
 @login_required
 @role_required("Admin")
 def admin_teachers_edit(teacher_id):
-    from db import list_schools, get_teacher, update_teacher
     teacher = get_teacher(teacher_id)
     if not teacher:
         flash("Teacher not found.", "error")
@@ -406,9 +455,9 @@ def admin_teachers_edit(teacher_id):
 
     if request.method == "POST":
         school_id = request.form.get("school_id", type=int)
-        name = (request.form.get("name") or "").strip()
-        email = (request.form.get("email") or "").strip().lower()
-        phone = (request.form.get("phone") or "").strip() or None
+        name = _sf("name")
+        email = _sf("email", lower=True)
+        phone = _of("phone")
 
         if not (school_id and name and email):
             return render_template("admin_teachers_edit.html",
@@ -416,6 +465,13 @@ def admin_teachers_edit(teacher_id):
                                    error="School, Name, and Email are required.")
 
         ok = update_teacher(teacher_id, school_id, name, email, phone)
+        if ok is None:
+            return render_template("admin_teachers_edit.html",
+                                   teacher=teacher, schools=schools,
+                                   error="The selected school does not exist.")
+        if not ok and not get_teacher(teacher_id):
+            flash("Teacher not found.", "error")
+            return redirect(url_for("admin_teachers_list"))
         if not ok:
             return render_template("admin_teachers_edit.html",
                                    teacher=teacher, schools=schools,
@@ -432,7 +488,6 @@ def admin_teachers_edit(teacher_id):
 @login_required
 @role_required("Admin")
 def admin_teachers_delete(teacher_id):
-    from db import deactivate_teacher, get_teacher
     teacher = get_teacher(teacher_id)
     if not teacher:
         flash("Teacher not found.", "error")
@@ -445,14 +500,19 @@ def admin_teachers_delete(teacher_id):
     return redirect(url_for("admin_teachers_list", school_id=to_school))
 
 # ---------- Admin: Subjects (NEW) ----------
+def _active_school_id(schools):
+    # ?school_id=… or the first school in the dropdown; the page already needs the
+    # (request-memoized) school list, so the default costs no extra query.
+    return request.args.get("school_id", type=int) or (schools[0]["id"] if schools else None)
+
 @app.route("/admin/subjects")
 @login_required
 @role_required("Admin")
 def admin_subjects_list():
-    school_id = request.args.get("school_id", type=int)
     schools = list_schools()
-    rows = list_subjects_by_school(school_id or schools[0]["id"]) if schools else []
-    return render_template("admin_subjects_list.html", subjects=rows, schools=schools, selected_school_id=school_id or (schools[0]["id"] if schools else None))
+    active_school_id = _active_school_id(schools)
+    rows = list_subjects_by_school(active_school_id) if active_school_id else []
+    return render_template("admin_subjects_list.html", subjects=rows, schools=schools, selected_school_id=active_school_id)
 
 @app.route("/admin/subjects/new", methods=["GET", "POST"])
 @login_required
@@ -464,10 +524,12 @@ def admin_subjects_new():
         return redirect(url_for("admin_schools_list"))
     if request.method == "POST":
         school_id = request.form.get("school_id", type=int)
-        name = (request.form.get("name") or "").strip()
+        name = _sf("name")
         if not (school_id and name):
             return render_template("admin_subjects_new.html", schools=schools, error="School and Subject name are required.")
         ok = insert_subject(school_id, name)
+        if ok is None:
+            return render_template("admin_subjects_new.html", schools=schools, error="The selected school does not exist.")
         if not ok:
             return render_template("admin_subjects_new.html", schools=schools, error="This subject already exists for the school.")
         flash("Subject added.", "success")
@@ -485,10 +547,15 @@ def admin_subjects_edit(subject_id):
     schools = list_schools()
     if request.method == "POST":
         school_id = request.form.get("school_id", type=int)
-        name = (request.form.get("name") or "").strip()
+        name = _sf("name")
         if not (school_id and name):
             return render_template("admin_subjects_edit.html", subject=row, schools=schools, error="School and Subject name are required.")
         ok = update_subject(subject_id, school_id, name)
+        if ok is None:
+            return render_template("admin_subjects_edit.html", subject=row, schools=schools, error="The selected school does not exist.")
+        if not ok and not get_subject(subject_id):
+            flash("Subject not found.", "error")
+            return redirect(url_for("admin_subjects_list"))
         if not ok:
             return render_template("admin_subjects_edit.html", subject=row, schools=schools, error="Duplicate subject for that school.")
         flash("Subject updated.", "success")
@@ -499,8 +566,10 @@ def admin_subjects_edit(subject_id):
 @login_required
 @role_required("Admin")
 def admin_subjects_delete(subject_id):
-    deactivate_subject(subject_id)
-    flash("Subject deleted.", "info")
+    if deactivate_subject(subject_id):
+        flash("Subject deleted.", "info")
+    else:
+        flash("Subject was already removed.", "info")
     return redirect(url_for("admin_subjects_list"))
 
 # ---------- Admin: Periods (NEW) ----------
@@ -508,9 +577,8 @@ def admin_subjects_delete(subject_id):
 @login_required
 @role_required("Admin")
 def admin_periods_list():
-    school_id = request.args.get("school_id", type=int)
     schools = list_schools()
-    active_school_id = school_id or (schools[0]["id"] if schools else None)
+    active_school_id = _active_school_id(schools)
     rows = list_periods_by_school(active_school_id) if active_school_id else []
     return render_template("admin_periods_list.html", periods=rows, schools=schools, selected_school_id=active_school_id)
 
@@ -524,13 +592,15 @@ def admin_periods_new():
         return redirect(url_for("admin_schools_list"))
     if request.method == "POST":
         school_id = request.form.get("school_id", type=int)
-        name = (request.form.get("name") or "").strip()
-        start_time = (request.form.get("start_time") or "").strip() or None
-        end_time = (request.form.get("end_time") or "").strip() or None
+        name = _sf("name")
+        start_time = _of("start_time")
+        end_time = _of("end_time")
         sort_order = request.form.get("sort_order", type=int) or 0
         if not (school_id and name):
             return render_template("admin_periods_new.html", schools=schools, error="School and Period name are required.")
         ok = insert_period(school_id, name, start_time, end_time, sort_order)
+        if ok is None:
+            return render_template("admin_periods_new.html", schools=schools, error="The selected school does not exist.")
         if not ok:
             return render_template("admin_periods_new.html", schools=schools, error="This period already exists for the school.")
         flash("Period added.", "success")
@@ -548,13 +618,18 @@ def admin_periods_edit(period_id):
     schools = list_schools()
     if request.method == "POST":
         school_id = request.form.get("school_id", type=int)
-        name = (request.form.get("name") or "").strip()
-        start_time = (request.form.get("start_time") or "").strip() or None
-        end_time = (request.form.get("end_time") or "").strip() or None
+        name = _sf("name")
+        start_time = _of("start_time")
+        end_time = _of("end_time")
         sort_order = request.form.get("sort_order", type=int) or 0
         if not (school_id and name):
             return render_template("admin_periods_edit.html", period=row, schools=schools, error="School and Period name are required.")
         ok = update_period(period_id, school_id, name, start_time, end_time, sort_order)
+        if ok is None:
+            return render_template("admin_periods_edit.html", period=row, schools=schools, error="The selected school does not exist.")
+        if not ok and not get_period(period_id):
+            flash("Period not found.", "error")
+            return redirect(url_for("admin_periods_list"))
         if not ok:
             return render_template("admin_periods_edit.html", period=row, schools=schools, error="Duplicate period for that school.")
         flash("Period updated.", "success")
@@ -565,8 +640,10 @@ def admin_periods_edit(period_id):
 @login_required
 @role_required("Admin")
 def admin_periods_delete(period_id):
-    deactivate_period(period_id)
-    flash("Period deleted.", "info")
+    if deactivate_period(period_id):
+        flash("Period deleted.", "info")
+    else:
+        flash("Period was already removed.", "info")
     return redirect(url_for("admin_periods_list"))
 
 # ---------- Admin: Teacher Assignments (NEW) ----------
@@ -608,7 +685,8 @@ def admin_assignments_new():
                                    teachers=list_teachers(school_id),
                                    subjects=list_subjects_by_school(school_id),
                                    sections=list_sections_with_class_by_school(school_id),
-                                   error="This assignment already exists.")
+                                   error=("The selected school, teacher, subject or section does not exist."
+                                          if ok is None else "This assignment already exists."))
         flash("Assignment created.", "success")
         return redirect(url_for("admin_assignments_list", school_id=school_id))
 
@@ -626,8 +704,10 @@ def admin_assignments_new():
 @login_required
 @role_required("Admin")
 def admin_assignments_delete(assignment_id):
-    deactivate_assignment(assignment_id)
-    flash("Assignment deleted.", "info")
+    if deactivate_assignment(assignment_id):
+        flash("Assignment deleted.", "info")
+    else:
+        flash("Assignment was already removed.", "info")
     return redirect(url_for("admin_assignments_list"))
 
 # ---------- Admin: Schools (edit) ----------
@@ -641,13 +721,16 @@ def admin_schools_edit(school_id):
         return redirect(url_for("admin_schools_list"))
 
     if request.method == "POST":
-        name = (request.form.get("name") or "").strip()
-        address = (request.form.get("address") or "").strip()
-        state = (request.form.get("state") or "").strip()
-        district = (request.form.get("district") or "").strip()
+        name = _sf("name")
+        address = _sf("address")
+        state = _sf("state")
+        district = _sf("district")
         if not name:
             return render_template("admin_schools_edit.html", school=school, error="School name is required.")
         ok = update_school(school_id, name, address or None, state or None, district or None)
+        if not ok and not get_school(school_id):
+            flash("School not found.", "error")
+            return redirect(url_for("admin_schools_list"))
         if not ok:
             return render_template("admin_schools_edit.html", school=school, error="A school with this name already exists.")
         flash("School updated.", "success")
@@ -660,46 +743,47 @@ def admin_schools_edit(school_id):
 @login_required
 @role_required("Admin")
 def admin_schools_delete(school_id):
-    deactivate_school(school_id)
-    flash("School deleted.", "info")
+    if deactivate_school(school_id):
+        flash("School deleted.", "info")
+    else:
+        flash("School was already removed.", "info")
     return redirect(url_for("admin_schools_list"))
 
 
 # ---------- Attendance: select (date/period/class/section) ----------
-from datetime import date as _date
+def _today_iso():
+    # Today's date (YYYY-MM-DD), read once per request
+    if "_today_iso" not in g:
+        g._today_iso = _date.today().isoformat()
+    return g._today_iso
 
 @app.route("/attendance/select", methods=["GET", "POST"])
 @login_required
 @role_required("Teacher", "Admin")
 def attendance_select():
-    # For MVP, let’s select school via class -> we already know class.school_id
-    class_id = request.args.get("class_id", type=int)
-    classes = []
-    # If you have a teacher-school scoping later, filter classes accordingly.
-    if class_id:
-        cls = get_class(class_id)
-    else:
-        cls = None
-
     if request.method == "POST":
         class_id = request.form.get("class_id", type=int)
         section_id = request.form.get("section_id", type=int)
         period_id = request.form.get("period_id", type=int)
-        date_str = request.form.get("date") or _date.today().isoformat()
+        date_str = request.form.get("date") or _today_iso()
         return redirect(url_for("attendance_mark",
                                 class_id=class_id, section_id=section_id,
                                 period_id=period_id, date=date_str))
-    # Build dropdowns if class is known
+
+    # For MVP, let’s select school via class -> we already know class.school_id
+    # If you have a teacher-school scoping later, filter classes accordingly.
+    class_id = request.args.get("class_id", type=int)
+    # Build dropdowns if class is known (class + its school's periods in one query)
+    cls, periods = get_class_with_periods(class_id) if class_id else (None, [])
     sections = list_sections_by_class(class_id) if class_id else []
-    periods = []
-    if cls:
-        periods = list_periods_by_school(cls["school_id"])
 
     return render_template("attendance_select.html",
                            cls=cls, sections=sections, periods=periods,
-                           today=_date.today().isoformat())
+                           today=_today_iso())
 
 # ---------- Attendance: mark page ----------
+_STATUS_RE = re.compile(r"^status_(\d+)$")
+
 @app.route("/attendance/mark", methods=["GET", "POST"])
 @login_required
 @role_required("Teacher", "Admin")
@@ -707,36 +791,47 @@ def attendance_mark():
     class_id = request.args.get("class_id", type=int) or request.form.get("class_id", type=int)
     section_id = request.args.get("section_id", type=int) or request.form.get("section_id", type=int)
     period_id = request.args.get("period_id", type=int) or request.form.get("period_id", type=int)
-    date_str = request.args.get("date") or request.form.get("date") or _date.today().isoformat()
+    date_str = request.args.get("date") or request.form.get("date") or _today_iso()
 
-    cls = get_class(class_id)
-    if not cls:
-        flash("Class not found.", "error")
-        return redirect(url_for("dashboard_teacher"))
-    # ensure session
-    session_id = get_or_create_attendance_session(
-        school_id=cls["school_id"], class_id=class_id, section_id=section_id,
-        period_id=period_id, date_str=date_str,
-        taken_by=(current_user().get("login_id") if current_user() else None)
-    )
+    user = current_user()
+    taken_by = user.get("login_id") if user else None
 
     if request.method == "POST" and request.form.get("action") == "save":
+        cls = get_class(class_id)
+        if not cls:
+            flash("Class not found.", "error")
+            return redirect(url_for("dashboard_teacher"))
+        period = get_period(period_id)
+        if not period or period["school_id"] != cls["school_id"]:
+            flash("Period not found.", "error")
+            return redirect(url_for("dashboard_teacher"))
+        # ensure session
+        session_id = get_or_create_attendance_session(
+            school_id=cls["school_id"], class_id=class_id, section_id=section_id,
+            period_id=period_id, date_str=date_str, taken_by=taken_by
+        )
+        if session_id is None:
+            flash("Section not found.", "error")
+            return redirect(url_for("dashboard_teacher"))
         # form fields: status_<student_id> with values Present/Absent
-        for key, value in request.form.items():
-            if key.startswith("status_"):
-                sid = int(key.split("_")[1])
-                status = "Present" if value == "Present" else "Absent"
-                upsert_attendance_mark(session_id, sid, status)
-        flash("Attendance saved.", "success")
+        form = request.form
+        rows = [(session_id, int(m.group(1)),
+                 "Present" if form[key] == "Present" else "Absent")
+                for key in form if (m := _STATUS_RE.match(key))]
+        if bulk_upsert_attendance_marks(rows):
+            flash("Attendance saved.", "success")
+        else:
+            flash("Could not save attendance.", "error")
         return redirect(url_for("attendance_mark",
                                 class_id=class_id, section_id=section_id,
                                 period_id=period_id, date=date_str))
 
-    # Load students + existing mark
-    students = list_students_with_mark(session_id, section_id)
-    # Load periods for header
-    periods = list_periods_by_school(cls["school_id"])
-    period = next((p for p in periods if p["id"] == period_id), None)
+    # Class, session, students + existing marks and the period header in one go
+    page = load_mark_page(class_id, section_id, period_id, date_str, taken_by)
+    if not page:
+        flash("Class, section or period not found.", "error")
+        return redirect(url_for("dashboard_teacher"))
+    cls, session_id, students, period = page
 
     return render_template("attendance_mark.html",
                            cls=cls, section_id=section_id, date_str=date_str,
@@ -748,12 +843,13 @@ def attendance_mark():
 @login_required
 @role_required("Teacher", "Admin")
 def attendance_report_daily(class_id):
-    date_str = request.args.get("date") or _date.today().isoformat()
-    cls = get_class(class_id)
-    if not cls:
+    date_str = request.args.get("date") or _today_iso()
+    # Class check and per-section summary in one query
+    report = load_daily_report(class_id, date_str)
+    if not report:
         flash("Class not found.", "error")
         return redirect(url_for("dashboard_teacher"))
-    summary = summarize_attendance_for_class_date(class_id, date_str)
+    cls, summary = report
     return render_template("attendance_report_day.html",
                            cls=cls, date_str=date_str, summary=summary)
 
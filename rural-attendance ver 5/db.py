@@ -1,5 +1,8 @@
 # db.py
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 DB_PATH = Path("rural_attendance.db")
@@ -37,10 +40,15 @@ CREATE TABLE IF NOT EXISTS classes (
   name TEXT NOT NULL,
   is_active INTEGER NOT NULL DEFAULT 1,
   created_at DATETIME DEFAULT (datetime('now')),
+  -- LKG, UKG first, then the rest by name (kept in sync by SQLite)
+  sort_key INTEGER GENERATED ALWAYS AS
+    (CASE name WHEN 'LKG' THEN 0 WHEN 'UKG' THEN 1 ELSE 2 END) VIRTUAL,
   UNIQUE(school_id, name),
   FOREIGN KEY (school_id) REFERENCES schools(id)
 );
-CREATE INDEX IF NOT EXISTS idx_classes_school ON classes (school_id, is_active);
+DROP INDEX IF EXISTS idx_classes_school;
+CREATE INDEX IF NOT EXISTS idx_classes_school_sort
+  ON classes (school_id, is_active, sort_key, name COLLATE NOCASE);
 
 -- Sections
 CREATE TABLE IF NOT EXISTS sections (
@@ -157,7 +165,13 @@ CREATE TABLE IF NOT EXISTS students (
   FOREIGN KEY (section_id) REFERENCES sections(id)
 );
 CREATE INDEX IF NOT EXISTS idx_students_school ON students (school_id, is_active);
-CREATE INDEX IF NOT EXISTS idx_students_section ON students (section_id, is_active);
+-- Section rosters in display order: the expression matches the roster ORDER BY,
+-- so those queries skip the sort; partial, so inactive students stay out of it
+DROP INDEX IF EXISTS idx_students_section;
+DROP INDEX IF EXISTS idx_students_section_active;
+CREATE INDEX IF NOT EXISTS idx_students_sort
+  ON students (section_id, COALESCE(roll_no, 999999), name COLLATE NOCASE, roll_no)
+  WHERE is_active = 1;
 
 -- Attendance sessions (one row per class/section/period/date)
 CREATE TABLE IF NOT EXISTS attendance_sessions (
@@ -176,6 +190,8 @@ CREATE TABLE IF NOT EXISTS attendance_sessions (
   FOREIGN KEY (period_id) REFERENCES periods(id)
 );
 CREATE INDEX IF NOT EXISTS idx_att_sess_school_date ON attendance_sessions (school_id, date);
+-- Daily report: one seek per section for that date
+CREATE INDEX IF NOT EXISTS idx_att_sess_section_date ON attendance_sessions (section_id, date);
 
 -- Attendance marks (one row per student in a session)
 CREATE TABLE IF NOT EXISTS attendance_marks (
@@ -188,477 +204,708 @@ CREATE TABLE IF NOT EXISTS attendance_marks (
   FOREIGN KEY (session_id) REFERENCES attendance_sessions(id),
   FOREIGN KEY (student_id) REFERENCES students(id)
 );
-CREATE INDEX IF NOT EXISTS idx_att_marks_session ON attendance_marks (session_id);
+-- UNIQUE(session_id, student_id) already serves session_id lookups
+DROP INDEX IF EXISTS idx_att_marks_session;
 
 """
 
 
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
+# Applied once per pooled connection; these are per-connection settings.
+# journal_mode=WAL is persistent in the file, so bootstrap() (SCHEMA_SQL) sets it once.
+CONN_PRAGMAS = """
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-20000;
+PRAGMA mmap_size=268435456;
+PRAGMA foreign_keys=ON;
+"""
+
+_local = threading.local()
+
+# Idle connections kept between requests (most recently used first)
+POOL_SIZE = 4
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+class _Connection(sqlite3.Connection):
+    # Set by transaction(): `with conn:` blocks inside it join the outer
+    # transaction instead of committing on exit.
+    held = False
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.held:
+            return False
+        return super().__exit__(exc_type, exc, tb)
+
+def _connect():
+    # check_same_thread=False: pooled connections move between request threads,
+    # but only one thread holds a given connection at a time.
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, factory=_Connection)
     conn.row_factory = sqlite3.Row
+    conn.executescript(CONN_PRAGMAS)
+    return conn
+
+def get_conn():
+    """
+    Return this thread's connection, taking an idle one from the pool (or
+    opening a new one) on first use. The app hands it back at the end of each
+    request (see close_conn), so pages share one connection and new requests
+    skip the connect + PRAGMA setup.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            conn = _connect()
+        _local.conn = conn
     return conn
 
+@contextmanager
+def transaction():
+    """
+    Run a batch of helper calls as one write transaction on this thread's
+    connection: a single BEGIN IMMEDIATE ... COMMIT (one fsync) instead of a
+    commit per helper. Rolls everything back if the block raises.
+    """
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    conn.held = True
+    try:
+        yield conn
+    except BaseException:
+        conn.held = False
+        conn.rollback()
+        raise
+    conn.held = False
+    conn.commit()
+
+def close_conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        return
+    _local.conn = None
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+# Columns added after a table first shipped: (table, column, definition).
+# CREATE TABLE IF NOT EXISTS leaves existing tables alone, so add them here.
+MIGRATIONS = [
+    ("classes", "sort_key",
+     "INTEGER GENERATED ALWAYS AS (CASE name WHEN 'LKG' THEN 0 WHEN 'UKG' THEN 1 ELSE 2 END) VIRTUAL"),
+]
+
+def _migrate(conn):
+    for table, column, ddl in MIGRATIONS:
+        cols = {r["name"] for r in conn.execute(f"PRAGMA table_xinfo({table})")}
+        if cols and column not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+def rows_as_dicts(cur):
+    # Plain dicts for list pages: fetch bare tuples (no sqlite3.Row per row) and zip once
+    cur.row_factory = None
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, r)) for r in cur.fetchall()]
+
+class RowStream:
+    """
+    Single-pass rows for a template loop: dicts are built as the loop pulls them
+    instead of fetching the whole list first. Truthiness peeks at the first row
+    so `{% if rows %}` still works. Only for pages that iterate once.
+    """
+    def __init__(self, cur):
+        cur.row_factory = None
+        self._cols = [c[0] for c in cur.description]
+        self._cur = cur
+        self._first = cur.fetchone()
+
+    def __bool__(self):
+        return self._first is not None
+
+    def __iter__(self):
+        cols, first = self._cols, self._first
+        if first is not None:
+            self._first = None
+            yield dict(zip(cols, first))
+        for r in self._cur:
+            yield dict(zip(cols, r))
+
 def bootstrap():
     with get_conn() as conn:
+        _migrate(conn)
         conn.executescript(SCHEMA_SQL)
+        # Refresh planner stats where they are missing or stale (cheap when nothing changed)
+        conn.execute("PRAGMA optimize")
 
 # ---- Users ----
 def get_user_by_login(login_id: str):
-    with get_conn() as conn:
-        cur = conn.execute(
-            "SELECT * FROM users WHERE login_id = ? AND is_active = 1",
-            (login_id,),
-        )
-        return cur.fetchone()
-
-def insert_user(login_id: str, password_hash: str, role: str) -> bool:
+    conn = get_conn()
+    cur = conn.execute(
+        "SELECT * FROM users WHERE login_id = ? AND is_active = 1",
+        (login_id,),
+    )
+    return cur.fetchone()
+
+# insert_*/update_* return True when the row was written and None when a row it
+# references (school, class, teacher, ...) does not exist. False means the write
+# would duplicate a unique key -- or, for update_*, that no active row matched the
+# id; callers that need to tell those apart re-fetch the row (see the edit views).
+def insert_user(login_id: str, password_hash: str, role: str) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute(
-                "INSERT INTO users(login_id, password_hash, role) VALUES(?,?,?)",
+            cur = conn.execute(
+                "INSERT INTO users(login_id, password_hash, role) VALUES(?,?,?) "
+                "ON CONFLICT DO NOTHING",
                 (login_id, password_hash, role),
             )
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
 # ---- Schools ----
 def list_schools():
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT id, name, address, state, district, is_active, created_at
-            FROM schools
-            WHERE is_active = 1
-            ORDER BY name COLLATE NOCASE
-        """)
-        return cur.fetchall()
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT id, name, address, state, district, is_active, created_at
+        FROM schools
+        WHERE is_active = 1
+        ORDER BY name COLLATE NOCASE
+    """)
+    return rows_as_dicts(cur)
 
 def insert_school(name: str, address: str | None = None,
-                  state: str | None = None, district: str | None = None) -> bool:
+                  state: str | None = None, district: str | None = None) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
+            cur = conn.execute("""
                 INSERT INTO schools (name, address, state, district)
                 VALUES (?,?,?,?)
+                ON CONFLICT DO NOTHING
             """, (name.strip(), address, state, district))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
-def get_school(school_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
+def insert_school_returning(name: str, address: str | None = None,
+                            state: str | None = None, district: str | None = None):
+    # Insert and return the new row in one statement; existing name -> the active row (or None)
+    try:
+        with get_conn() as conn:
+            return conn.execute("""
+                INSERT INTO schools (name, address, state, district)
+                VALUES (?,?,?,?)
+                RETURNING id, name, address, state, district, is_active, created_at
+            """, (name.strip(), address, state, district)).fetchone()
+    except sqlite3.IntegrityError:
+        conn = get_conn()
+        return conn.execute("""
             SELECT id, name, address, state, district, is_active, created_at
-            FROM schools WHERE id = ? AND is_active = 1
-        """, (school_id,))
-        return cur.fetchone()
+            FROM schools WHERE name = ? AND is_active = 1
+        """, (name.strip(),)).fetchone()
+
+def get_school(school_id: int):
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT id, name, address, state, district, is_active, created_at
+        FROM schools WHERE id = ? AND is_active = 1
+    """, (school_id,))
+    return cur.fetchone()
 
 def update_school(school_id: int, name: str,
-                  address: str | None, state: str | None, district: str | None) -> bool:
+                  address: str | None, state: str | None, district: str | None) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
-                UPDATE schools
+            cur = conn.execute("""
+                UPDATE OR IGNORE schools
                 SET name = ?, address = ?, state = ?, district = ?
                 WHERE id = ? AND is_active = 1
             """, (name.strip(), address, state, district, school_id))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
-def deactivate_school(school_id: int) -> None:
+def deactivate_school(school_id: int) -> bool:
+    # False when the row was already inactive (nothing written); same for the other deactivate_*
     with get_conn() as conn:
-        conn.execute("UPDATE schools SET is_active = 0 WHERE id = ?", (school_id,))
+        cur = conn.execute("UPDATE schools SET is_active = 0 WHERE id = ? AND is_active = 1", (school_id,))
+        return cur.rowcount > 0
 
 # ---- Classes ----
 def list_classes_by_school(school_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT id, school_id, name, is_active, created_at
-            FROM classes
-            WHERE school_id = ? AND is_active = 1
-            ORDER BY 
-              CASE name
-                WHEN 'LKG' THEN 0 WHEN 'UKG' THEN 1
-                ELSE 2
-              END,
-              name COLLATE NOCASE
-        """, (school_id,))
-        return cur.fetchall()
-
-def insert_class(school_id: int, name: str) -> bool:
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT id, school_id, name, is_active, created_at
+        FROM classes
+        WHERE school_id = ? AND is_active = 1
+        ORDER BY sort_key, name COLLATE NOCASE
+    """, (school_id,))
+    return rows_as_dicts(cur)
+
+def get_class_with_periods(class_id: int):
+    # (class dict, [active periods of its school]) from one joined query; (None, []) if missing
+    conn = get_conn()
+    rows = conn.execute("""
+        SELECT c.id, c.school_id, c.name, s.name AS school_name,
+               p.id AS period_id, p.name AS period_name, p.start_time, p.end_time, p.sort_order
+        FROM classes c
+        JOIN schools s ON s.id = c.school_id
+        LEFT JOIN periods p ON p.school_id = c.school_id AND p.is_active = 1
+        WHERE c.id = ? AND c.is_active = 1 AND s.is_active = 1
+        ORDER BY p.sort_order, p.name COLLATE NOCASE
+    """, (class_id,)).fetchall()
+    if not rows:
+        return None, []
+    first = rows[0]
+    cls = {"id": first["id"], "school_id": first["school_id"],
+           "name": first["name"], "school_name": first["school_name"]}
+    periods = [{"id": r["period_id"], "school_id": r["school_id"], "name": r["period_name"],
+                "start_time": r["start_time"], "end_time": r["end_time"], "sort_order": r["sort_order"]}
+               for r in rows if r["period_id"] is not None]
+    return cls, periods
+
+def insert_class(school_id: int, name: str) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
+            cur = conn.execute("""
                 INSERT INTO classes (school_id, name)
                 VALUES (?, ?)
+                ON CONFLICT DO NOTHING
             """, (school_id, name.strip()))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
 def get_class(class_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT c.id, c.school_id, c.name, c.is_active, c.created_at,
-                   s.name AS school_name
-            FROM classes c
-            JOIN schools s ON s.id = c.school_id
-            WHERE c.id = ? AND c.is_active = 1 AND s.is_active = 1
-        """, (class_id,))
-        return cur.fetchone()
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT c.id, c.school_id, c.name, c.is_active, c.created_at,
+               s.name AS school_name
+        FROM classes c
+        JOIN schools s ON s.id = c.school_id
+        WHERE c.id = ? AND c.is_active = 1 AND s.is_active = 1
+    """, (class_id,))
+    return cur.fetchone()
 
 # ---- Sections ----
 def list_sections_by_class(class_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT id, class_id, name, is_active, created_at
-            FROM sections
-            WHERE class_id = ? AND is_active = 1
-            ORDER BY name COLLATE NOCASE
-        """, (class_id,))
-        return cur.fetchall()
-
-def insert_section(class_id: int, name: str) -> bool:
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT id, class_id, name, is_active, created_at
+        FROM sections
+        WHERE class_id = ? AND is_active = 1
+        ORDER BY name COLLATE NOCASE
+    """, (class_id,))
+    return rows_as_dicts(cur)
+
+def insert_section(class_id: int, name: str) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
+            cur = conn.execute("""
                 INSERT INTO sections (class_id, name)
                 VALUES (?, ?)
+                ON CONFLICT DO NOTHING
             """, (class_id, name.strip()))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
 # Helper: sections with class names for a school (for assignment form)
 def list_sections_with_class_by_school(school_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT sec.id AS section_id, sec.name AS section_name,
-                   cls.id AS class_id, cls.name AS class_name
-            FROM sections sec
-            JOIN classes cls ON cls.id = sec.class_id
-            WHERE cls.school_id = ? AND sec.is_active = 1 AND cls.is_active = 1
-            ORDER BY cls.name COLLATE NOCASE, sec.name COLLATE NOCASE
-        """, (school_id,))
-        return cur.fetchall()
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT sec.id AS section_id, sec.name AS section_name,
+               cls.id AS class_id, cls.name AS class_name
+        FROM sections sec
+        JOIN classes cls ON cls.id = sec.class_id
+        WHERE cls.school_id = ? AND sec.is_active = 1 AND cls.is_active = 1
+        ORDER BY cls.name COLLATE NOCASE, sec.name COLLATE NOCASE
+    """, (school_id,))
+    return rows_as_dicts(cur)
+
+# Helper: every class of a school with its section names (LEFT JOIN: classes with no
+# sections come back once with section_name NULL). Used by the seeder.
+def list_classes_with_sections_by_school(school_id: int):
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT c.id AS class_id, c.name AS class_name,
+               sec.id AS section_id, sec.name AS section_name
+        FROM classes c
+        LEFT JOIN sections sec ON sec.class_id = c.id AND sec.is_active = 1
+        WHERE c.school_id = ? AND c.is_active = 1
+        ORDER BY c.sort_key, c.name COLLATE NOCASE, sec.name COLLATE NOCASE
+    """, (school_id,))
+    return rows_as_dicts(cur)
 
 # ---- Teachers ----
 def list_teachers(school_id: int | None = None):
-    with get_conn() as conn:
-        if school_id:
-            cur = conn.execute("""
-                SELECT t.id, t.name, t.email, t.phone, t.created_at,
-                       s.id AS school_id, s.name AS school_name
-                FROM teachers t
-                JOIN schools s ON s.id = t.school_id
-                WHERE t.is_active = 1 AND s.is_active = 1 AND t.school_id = ?
-                ORDER BY t.name COLLATE NOCASE
-            """, (school_id,))
-        else:
-            cur = conn.execute("""
-                SELECT t.id, t.name, t.email, t.phone, t.created_at,
-                       s.id AS school_id, s.name AS school_name
-                FROM teachers t
-                JOIN schools s ON s.id = t.school_id
-                WHERE t.is_active = 1 AND s.is_active = 1
-                ORDER BY s.name COLLATE NOCASE, t.name COLLATE NOCASE
-            """)
-        return cur.fetchall()
-
-def insert_teacher(school_id: int, name: str, email: str, phone: str | None):
+    conn = get_conn()
+    if school_id:
+        cur = conn.execute("""
+            SELECT t.id, t.name, t.email, t.phone, t.created_at,
+                   s.id AS school_id, s.name AS school_name
+            FROM teachers t
+            JOIN schools s ON s.id = t.school_id
+            WHERE t.is_active = 1 AND s.is_active = 1 AND t.school_id = ?
+            ORDER BY t.name COLLATE NOCASE
+        """, (school_id,))
+    else:
+        cur = conn.execute("""
+            SELECT t.id, t.name, t.email, t.phone, t.created_at,
+                   s.id AS school_id, s.name AS school_name
+            FROM teachers t
+            JOIN schools s ON s.id = t.school_id
+            WHERE t.is_active = 1 AND s.is_active = 1
+            ORDER BY s.name COLLATE NOCASE, t.name COLLATE NOCASE
+        """)
+    return rows_as_dicts(cur)
+
+def insert_teacher(school_id: int, name: str, email: str, phone: str | None) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
+            cur = conn.execute("""
                 INSERT INTO teachers (school_id, name, email, phone)
                 VALUES (?,?,?,?)
+                ON CONFLICT DO NOTHING
             """, (school_id, name.strip(), email.strip().lower(), phone))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
 def get_teacher(teacher_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT t.id, t.school_id, t.name, t.email, t.phone, t.is_active, t.created_at,
-                   s.name AS school_name
-            FROM teachers t
-            JOIN schools s ON s.id = t.school_id
-            WHERE t.id = ? AND t.is_active = 1 AND s.is_active = 1
-        """, (teacher_id,))
-        return cur.fetchone()
-
-def update_teacher(teacher_id: int, school_id: int, name: str, email: str, phone: str | None):
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT t.id, t.school_id, t.name, t.email, t.phone, t.is_active, t.created_at,
+               s.name AS school_name
+        FROM teachers t
+        JOIN schools s ON s.id = t.school_id
+        WHERE t.id = ? AND t.is_active = 1 AND s.is_active = 1
+    """, (teacher_id,))
+    return cur.fetchone()
+
+def update_teacher(teacher_id: int, school_id: int, name: str, email: str, phone: str | None) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
-                UPDATE teachers
+            cur = conn.execute("""
+                UPDATE OR IGNORE teachers
                 SET school_id = ?, name = ?, email = ?, phone = ?
                 WHERE id = ? AND is_active = 1
             """, (school_id, name.strip(), email.strip().lower(), phone, teacher_id))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
-def deactivate_teacher(teacher_id: int):
+def deactivate_teacher(teacher_id: int) -> bool:
     with get_conn() as conn:
-        conn.execute("UPDATE teachers SET is_active = 0 WHERE id = ?", (teacher_id,))
+        cur = conn.execute("UPDATE teachers SET is_active = 0 WHERE id = ? AND is_active = 1", (teacher_id,))
+        return cur.rowcount > 0
 
 # ---- Subjects ----
 def list_subjects_by_school(school_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT id, school_id, name, is_active, created_at
-            FROM subjects
-            WHERE school_id = ? AND is_active = 1
-            ORDER BY name COLLATE NOCASE
-        """, (school_id,))
-        return cur.fetchall()
-
-def insert_subject(school_id: int, name: str) -> bool:
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT id, school_id, name, is_active, created_at
+        FROM subjects
+        WHERE school_id = ? AND is_active = 1
+        ORDER BY name COLLATE NOCASE
+    """, (school_id,))
+    return rows_as_dicts(cur)
+
+def insert_subject(school_id: int, name: str) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
+            cur = conn.execute("""
                 INSERT INTO subjects (school_id, name)
                 VALUES (?,?)
+                ON CONFLICT DO NOTHING
             """, (school_id, name.strip()))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
 def get_subject(subject_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT sub.id, sub.school_id, sub.name, sub.is_active, sub.created_at,
-                   s.name AS school_name
-            FROM subjects sub
-            JOIN schools s ON s.id = sub.school_id
-            WHERE sub.id = ? AND sub.is_active = 1 AND s.is_active = 1
-        """, (subject_id,))
-        return cur.fetchone()
-
-def update_subject(subject_id: int, school_id: int, name: str) -> bool:
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT sub.id, sub.school_id, sub.name, sub.is_active, sub.created_at,
+               s.name AS school_name
+        FROM subjects sub
+        JOIN schools s ON s.id = sub.school_id
+        WHERE sub.id = ? AND sub.is_active = 1 AND s.is_active = 1
+    """, (subject_id,))
+    return cur.fetchone()
+
+def update_subject(subject_id: int, school_id: int, name: str) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
-                UPDATE subjects
+            cur = conn.execute("""
+                UPDATE OR IGNORE subjects
                 SET school_id = ?, name = ?
                 WHERE id = ? AND is_active = 1
             """, (school_id, name.strip(), subject_id))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
-def deactivate_subject(subject_id: int):
+def deactivate_subject(subject_id: int) -> bool:
     with get_conn() as conn:
-        conn.execute("UPDATE subjects SET is_active = 0 WHERE id = ?", (subject_id,))
+        cur = conn.execute("UPDATE subjects SET is_active = 0 WHERE id = ? AND is_active = 1", (subject_id,))
+        return cur.rowcount > 0
 
 # ---- Periods ----
 def list_periods_by_school(school_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT id, school_id, name, start_time, end_time, sort_order, is_active, created_at
-            FROM periods
-            WHERE school_id = ? AND is_active = 1
-            ORDER BY sort_order, name COLLATE NOCASE
-        """, (school_id,))
-        return cur.fetchall()
-
-def insert_period(school_id: int, name: str, start_time: str | None, end_time: str | None, sort_order: int = 0) -> bool:
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT id, school_id, name, start_time, end_time, sort_order, is_active, created_at
+        FROM periods
+        WHERE school_id = ? AND is_active = 1
+        ORDER BY sort_order, name COLLATE NOCASE
+    """, (school_id,))
+    return rows_as_dicts(cur)
+
+def insert_period(school_id: int, name: str, start_time: str | None, end_time: str | None, sort_order: int = 0) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
+            cur = conn.execute("""
                 INSERT INTO periods (school_id, name, start_time, end_time, sort_order)
                 VALUES (?,?,?,?,?)
+                ON CONFLICT DO NOTHING
             """, (school_id, name.strip(), start_time, end_time, sort_order))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
 def get_period(period_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT p.id, p.school_id, p.name, p.start_time, p.end_time, p.sort_order, p.is_active, p.created_at,
-                   s.name AS school_name
-            FROM periods p
-            JOIN schools s ON s.id = p.school_id
-            WHERE p.id = ? AND p.is_active = 1 AND s.is_active = 1
-        """, (period_id,))
-        return cur.fetchone()
-
-def update_period(period_id: int, school_id: int, name: str, start_time: str | None, end_time: str | None, sort_order: int) -> bool:
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT p.id, p.school_id, p.name, p.start_time, p.end_time, p.sort_order, p.is_active, p.created_at,
+               s.name AS school_name
+        FROM periods p
+        JOIN schools s ON s.id = p.school_id
+        WHERE p.id = ? AND p.is_active = 1 AND s.is_active = 1
+    """, (period_id,))
+    return cur.fetchone()
+
+def update_period(period_id: int, school_id: int, name: str, start_time: str | None, end_time: str | None, sort_order: int) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
-                UPDATE periods
+            cur = conn.execute("""
+                UPDATE OR IGNORE periods
                 SET school_id = ?, name = ?, start_time = ?, end_time = ?, sort_order = ?
                 WHERE id = ? AND is_active = 1
             """, (school_id, name.strip(), start_time, end_time, sort_order, period_id))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
-def deactivate_period(period_id: int):
+def deactivate_period(period_id: int) -> bool:
     with get_conn() as conn:
-        conn.execute("UPDATE periods SET is_active = 0 WHERE id = ?", (period_id,))
+        cur = conn.execute("UPDATE periods SET is_active = 0 WHERE id = ? AND is_active = 1", (period_id,))
+        return cur.rowcount > 0
 
 # ---- Teacher Assignments ----
 def list_assignments(school_id: int | None = None):
-    with get_conn() as conn:
-        base = """
-            SELECT ta.id, ta.school_id,
-                   t.name AS teacher_name, t.id AS teacher_id,
-                   sub.name AS subject_name, sub.id AS subject_id,
-                   c.name AS class_name, c.id AS class_id,
-                   sec.name AS section_name, sec.id AS section_id,
-                   ta.created_at
-            FROM teacher_assignments ta
-            JOIN teachers t ON t.id = ta.teacher_id
-            JOIN subjects sub ON sub.id = ta.subject_id
-            JOIN classes c ON c.id = ta.class_id
-            JOIN sections sec ON sec.id = ta.section_id
-            WHERE ta.is_active = 1 AND t.is_active = 1 AND sub.is_active = 1 AND c.is_active = 1 AND sec.is_active = 1
-        """
-        if school_id:
-            cur = conn.execute(base + " AND ta.school_id = ? ORDER BY teacher_name COLLATE NOCASE", (school_id,))
-        else:
-            cur = conn.execute(base + " ORDER BY ta.school_id, teacher_name COLLATE NOCASE")
-        return cur.fetchall()
-
-def insert_assignment(school_id: int, teacher_id: int, subject_id: int, class_id: int, section_id: int) -> bool:
+    conn = get_conn()
+    base = """
+        SELECT ta.id, ta.school_id,
+               t.name AS teacher_name, t.id AS teacher_id,
+               sub.name AS subject_name, sub.id AS subject_id,
+               c.name AS class_name, c.id AS class_id,
+               sec.name AS section_name, sec.id AS section_id,
+               ta.created_at
+        FROM teacher_assignments ta
+        JOIN teachers t ON t.id = ta.teacher_id
+        JOIN subjects sub ON sub.id = ta.subject_id
+        JOIN classes c ON c.id = ta.class_id
+        JOIN sections sec ON sec.id = ta.section_id
+        WHERE ta.is_active = 1 AND t.is_active = 1 AND sub.is_active = 1 AND c.is_active = 1 AND sec.is_active = 1
+    """
+    if school_id:
+        cur = conn.execute(base + " AND ta.school_id = ? ORDER BY teacher_name COLLATE NOCASE", (school_id,))
+    else:
+        cur = conn.execute(base + " ORDER BY ta.school_id, teacher_name COLLATE NOCASE")
+    return RowStream(cur)
+
+def insert_assignment(school_id: int, teacher_id: int, subject_id: int, class_id: int, section_id: int) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
+            cur = conn.execute("""
                 INSERT INTO teacher_assignments (school_id, teacher_id, subject_id, class_id, section_id)
                 VALUES (?,?,?,?,?)
+                ON CONFLICT DO NOTHING
             """, (school_id, teacher_id, subject_id, class_id, section_id))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
-def deactivate_assignment(assignment_id: int):
+def deactivate_assignment(assignment_id: int) -> bool:
     with get_conn() as conn:
-        conn.execute("UPDATE teacher_assignments SET is_active = 0 WHERE id = ?", (assignment_id,))
+        cur = conn.execute("UPDATE teacher_assignments SET is_active = 0 WHERE id = ? AND is_active = 1", (assignment_id,))
+        return cur.rowcount > 0
 
 # ---- Timetable entries (NEW) ----
 def insert_timetable_entry(school_id: int, date: str, period_id: int,
                            class_id: int, section_id: int,
-                           subject_id: int, teacher_id: int) -> bool:
+                           subject_id: int, teacher_id: int) -> bool | None:
     """
     Insert one timetable cell. Safe to call repeatedly: UNIQUE constraint avoids duplicates.
     date must be 'YYYY-MM-DD'.
     """
     try:
         with get_conn() as conn:
-            conn.execute("""
+            cur = conn.execute("""
                 INSERT INTO timetable_entries
                   (school_id, date, period_id, class_id, section_id, subject_id, teacher_id)
                 VALUES (?,?,?,?,?,?,?)
+                ON CONFLICT DO NOTHING
             """, (school_id, date, period_id, class_id, section_id, subject_id, teacher_id))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
 # ---- Students ----
 def list_students_by_section(section_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT st.id, st.school_id, st.class_id, st.section_id,
-                   st.name, st.roll_no, st.admission_no, st.dob, st.gender,
-                   st.guardian_name, st.guardian_phone, st.address, st.created_at,
-                   c.name AS class_name, s.name AS section_name
-            FROM students st
-            JOIN classes c ON c.id = st.class_id
-            JOIN sections s ON s.id = st.section_id
-            WHERE st.section_id = ? AND st.is_active = 1
-            ORDER BY COALESCE(st.roll_no, 999999), st.name COLLATE NOCASE
-        """, (section_id,))
-        return cur.fetchall()
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT st.id, st.school_id, st.class_id, st.section_id,
+               st.name, st.roll_no, st.admission_no, st.dob, st.gender,
+               st.guardian_name, st.guardian_phone, st.address, st.created_at,
+               c.name AS class_name, s.name AS section_name
+        FROM students st
+        JOIN classes c ON c.id = st.class_id
+        JOIN sections s ON s.id = st.section_id
+        WHERE st.section_id = ? AND st.is_active = 1
+        ORDER BY COALESCE(st.roll_no, 999999), st.name COLLATE NOCASE
+    """, (section_id,))
+    return RowStream(cur)
 
 def insert_student(school_id: int, class_id: int, section_id: int,
                    name: str, roll_no: int | None, admission_no: str | None,
                    dob: str | None, gender: str | None,
                    guardian_name: str | None, guardian_phone: str | None,
-                   address: str | None) -> bool:
+                   address: str | None) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
+            cur = conn.execute("""
                 INSERT INTO students
                   (school_id, class_id, section_id, name, roll_no, admission_no, dob, gender,
                    guardian_name, guardian_phone, address)
                 VALUES (?,?,?,?,?,?,?,?,?,?,?)
+                ON CONFLICT DO NOTHING
             """, (school_id, class_id, section_id, name.strip(),
                   roll_no, (admission_no or None), (dob or None), (gender or None),
                   (guardian_name or None), (guardian_phone or None), (address or None)))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
 def get_student(student_id: int):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT st.*, c.name AS class_name, s.name AS section_name
-            FROM students st
-            JOIN classes c ON c.id = st.class_id
-            JOIN sections s ON s.id = st.section_id
-            WHERE st.id = ? AND st.is_active = 1
-        """, (student_id,))
-        return cur.fetchone()
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT st.id, st.school_id, st.class_id, st.section_id,
+               st.name, st.roll_no, st.admission_no, st.dob, st.gender,
+               st.guardian_name, st.guardian_phone, st.address, st.created_at,
+               c.name AS class_name, s.name AS section_name
+        FROM students st
+        JOIN classes c ON c.id = st.class_id
+        JOIN sections s ON s.id = st.section_id
+        WHERE st.id = ? AND st.is_active = 1
+    """, (student_id,))
+    return cur.fetchone()
 
 def update_student(student_id: int,
                    name: str, roll_no: int | None, admission_no: str | None,
                    dob: str | None, gender: str | None,
                    guardian_name: str | None, guardian_phone: str | None,
-                   address: str | None) -> bool:
+                   address: str | None) -> bool | None:
     try:
         with get_conn() as conn:
-            conn.execute("""
-                UPDATE students
+            cur = conn.execute("""
+                UPDATE OR IGNORE students
                 SET name = ?, roll_no = ?, admission_no = ?, dob = ?, gender = ?,
                     guardian_name = ?, guardian_phone = ?, address = ?
                 WHERE id = ? AND is_active = 1
             """, (name.strip(), roll_no, (admission_no or None), (dob or None), (gender or None),
                   (guardian_name or None), (guardian_phone or None), (address or None),
                   student_id))
-        return True
+        return cur.rowcount > 0
     except sqlite3.IntegrityError:
-        return False
+        return None
 
-def deactivate_student(student_id: int):
+def deactivate_student(student_id: int) -> bool:
     with get_conn() as conn:
-        conn.execute("UPDATE students SET is_active = 0 WHERE id = ?", (student_id,))
+        cur = conn.execute("UPDATE students SET is_active = 0 WHERE id = ? AND is_active = 1", (student_id,))
+        return cur.rowcount > 0
 
 
 # ---- Attendance (sessions + marks) ----
 def get_or_create_attendance_session(school_id: int, class_id: int, section_id: int,
                                      period_id: int, date_str: str, taken_by: str | None):
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT id FROM attendance_sessions
-            WHERE school_id=? AND class_id=? AND section_id=? AND period_id=? AND date=?
-        """, (school_id, class_id, section_id, period_id, date_str))
-        row = cur.fetchone()
-        if row:
-            return row["id"]
-        cur = conn.execute("""
-            INSERT INTO attendance_sessions (school_id, class_id, section_id, period_id, date, taken_by)
-            VALUES (?,?,?,?,?,?)
-        """, (school_id, class_id, section_id, period_id, date_str, taken_by))
-        return cur.lastrowid
+    key = (school_id, class_id, section_id, period_id, date_str)
+    find = """
+        SELECT id FROM attendance_sessions
+        WHERE school_id=? AND class_id=? AND section_id=? AND period_id=? AND date=?
+    """
+    # Existing session (the common mark-page path): a plain read, no write transaction
+    conn = get_conn()
+    row = conn.execute(find, key).fetchone()
+    if row:
+        return row[0]
+    try:
+        with conn:
+            row = conn.execute("""
+                INSERT INTO attendance_sessions (school_id, class_id, section_id, period_id, date, taken_by)
+                VALUES (?,?,?,?,?,?)
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            """, key + (taken_by,)).fetchone()
+    except sqlite3.IntegrityError:
+        return None  # class/section/period id that doesn't exist
+    if row:
+        return row[0]
+    # Lost a race with another request creating the same session
+    return conn.execute(find, key).fetchone()[0]
 
 def list_students_with_mark(session_id: int, section_id: int):
     # Return students of section with joined status if already marked
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT st.id AS student_id, st.name, st.roll_no,
-                   am.status
-            FROM students st
-            LEFT JOIN attendance_marks am
-              ON am.student_id = st.id AND am.session_id = ?
-            WHERE st.section_id = ? AND st.is_active = 1
-            ORDER BY COALESCE(st.roll_no, 999999), st.name COLLATE NOCASE
-        """, (session_id, section_id))
-        return cur.fetchall()
+    conn = get_conn()
+    cur = conn.execute("""
+        SELECT st.id AS student_id, st.name, st.roll_no,
+               am.status
+        FROM students st
+        LEFT JOIN attendance_marks am
+          ON am.student_id = st.id AND am.session_id = ?
+        WHERE st.section_id = ? AND st.is_active = 1
+        ORDER BY COALESCE(st.roll_no, 999999), st.name COLLATE NOCASE
+    """, (session_id, section_id))
+    return rows_as_dicts(cur)
+
+def load_mark_page(class_id: int, section_id: int, period_id: int,
+                   date_str: str, taken_by: str | None):
+    # Everything the mark page needs on one connection:
+    # (class row, session_id, students with marks, period dict); None if the class,
+    # period or section doesn't exist
+    conn = get_conn()
+    cls = conn.execute("""
+        SELECT c.id, c.school_id, c.name, c.is_active, c.created_at,
+               s.name AS school_name,
+               p.id AS period_id, p.name AS period_name, p.start_time, p.end_time
+        FROM classes c
+        JOIN schools s ON s.id = c.school_id
+        LEFT JOIN periods p ON p.id = ? AND p.school_id = c.school_id AND p.is_active = 1
+        WHERE c.id = ? AND c.is_active = 1 AND s.is_active = 1
+    """, (period_id, class_id)).fetchone()
+    if not cls or cls["period_id"] is None:
+        return None
+    session_id = get_or_create_attendance_session(cls["school_id"], class_id, section_id,
+                                                  period_id, date_str, taken_by)
+    if session_id is None:
+        return None
+    students = list_students_with_mark(session_id, section_id)
+    period = {"id": cls["period_id"], "name": cls["period_name"],
+              "start_time": cls["start_time"], "end_time": cls["end_time"]}
+    return cls, session_id, students, period
 
 def upsert_attendance_mark(session_id: int, student_id: int, status: str) -> bool:
     try:
@@ -672,20 +919,44 @@ def upsert_attendance_mark(session_id: int, student_id: int, status: str) -> boo
     except sqlite3.IntegrityError:
         return False
 
-def summarize_attendance_for_class_date(class_id: int, date_str: str):
-    # returns [(section_id, section_name, present, absent, total)]
-    with get_conn() as conn:
-        cur = conn.execute("""
-            SELECT sec.id AS section_id, sec.name AS section_name,
-                   SUM(CASE am.status WHEN 'Present' THEN 1 ELSE 0 END) AS present,
-                   SUM(CASE am.status WHEN 'Absent' THEN 1 ELSE 0 END)  AS absent,
-                   COUNT(am.id) AS total
-            FROM sections sec
-            JOIN attendance_sessions ses ON ses.section_id = sec.id
-            LEFT JOIN attendance_marks am ON am.session_id = ses.id
-            WHERE sec.class_id = ? AND ses.date = ?
-            GROUP BY sec.id, sec.name
-            ORDER BY sec.name COLLATE NOCASE
-        """, (class_id, date_str))
-        return cur.fetchall()
+def bulk_upsert_attendance_marks(rows) -> bool:
+    # rows: [(session_id, student_id, status)] -- saved in one transaction
+    try:
+        with get_conn() as conn:
+            conn.executemany("""
+                INSERT INTO attendance_marks (session_id, student_id, status)
+                VALUES (?,?,?)
+                ON CONFLICT(session_id, student_id) DO UPDATE SET
+                  status = excluded.status, marked_at = datetime('now')
+            """, rows)
+        return True
+    except sqlite3.IntegrityError:
+        return False
 
+def load_daily_report(class_id: int, date_str: str):
+    # (class dict, per-section summary rows) from one query; None if the class is missing
+    conn = get_conn()
+    rows = conn.execute("""
+        SELECT c.id AS class_id, c.school_id, c.name AS class_name, s.name AS school_name,
+               sec.id AS section_id, sec.name AS section_name,
+               COUNT(*) FILTER (WHERE am.status = 'Present') AS present,
+               COUNT(*) FILTER (WHERE am.status = 'Absent')  AS absent,
+               COUNT(am.id) AS total, COUNT(ses.id) AS sessions
+        FROM classes c
+        JOIN schools s ON s.id = c.school_id
+        LEFT JOIN sections sec ON sec.class_id = c.id AND sec.is_active = 1
+        LEFT JOIN attendance_sessions ses ON ses.section_id = sec.id AND ses.date = ?
+        LEFT JOIN attendance_marks am ON am.session_id = ses.id
+        WHERE c.id = ? AND c.is_active = 1 AND s.is_active = 1
+        GROUP BY sec.id, sec.name
+        ORDER BY sec.name COLLATE NOCASE
+    """, (date_str, class_id)).fetchall()
+    if not rows:
+        return None
+    first = rows[0]
+    cls = {"id": first["class_id"], "school_id": first["school_id"],
+           "name": first["class_name"], "school_name": first["school_name"]}
+    summary = [{"section_id": r["section_id"], "section_name": r["section_name"],
+                "present": r["present"], "absent": r["absent"], "total": r["total"]}
+               for r in rows if r["sessions"]]
+    return cls, summary
@@ -23,26 +23,25 @@ Options:
 
 import argparse
 import random
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import date, timedelta, datetime
+from functools import lru_cache
+from itertools import cycle, groupby, islice
+from operator import itemgetter
 from pathlib import Path
 from werkzeug.security import generate_password_hash
 
 from db import (
-    DB_PATH, bootstrap, get_conn,
+    DB_PATH, bootstrap, get_conn, transaction,
     # schools
-    list_schools, insert_school,
+    insert_school_returning,
     # classes/sections
-    list_classes_by_school, insert_class, list_sections_by_class, insert_section, get_class,
-    # teachers + users
-    list_teachers, insert_teacher, insert_user, get_user_by_login,
+    list_classes_with_sections_by_school,
     # subjects
-    list_subjects_by_school, insert_subject,
+    list_subjects_by_school,
     # periods
-    list_periods_by_school, insert_period,
-    # assignments
-    insert_assignment,
-    # timetable
-    insert_timetable_entry
+    list_periods_by_school
 )
 
 # ---------- Static data ----------
@@ -84,15 +83,17 @@ SUBJECTS_PRIMARY = ["English","Hindi","Mathematics","EVS","General Knowledge","A
 SUBJECTS_MIDDLE  = ["English","Hindi","Mathematics","Science","Social Science","Computer Science","Arts","Physical Education"]
 SUBJECTS_HIGH    = ["English","Hindi","Mathematics","Physics","Chemistry","Biology","History","Geography","Civics","Economics","Computer Science","Physical Education"]
 
+# Subject tier per class name, built once (anything else, e.g. 9..12, is high school)
+_TIER_BY_CLASS = {n: SUBJECTS_PRIMARY for n in ("LKG","UKG","1","2","3","4","5")}
+_TIER_BY_CLASS.update({n: SUBJECTS_MIDDLE for n in ("6","7","8")})
+
 def subjects_for_class(cls_name: str):
-    if cls_name in ("LKG","UKG","1","2","3","4","5"):
-        return SUBJECTS_PRIMARY
-    if cls_name in ("6","7","8"):
-        return SUBJECTS_MIDDLE
-    return SUBJECTS_HIGH
+    return _TIER_BY_CLASS.get(cls_name, SUBJECTS_HIGH)
 
 # ---------- Purge (fast reset) ----------
 PURGE_ORDER_CHILD_FIRST = [
+    "attendance_marks",
+    "attendance_sessions",
     "timetable_entries",
     "teacher_assignments",
     "students",
@@ -106,32 +107,40 @@ PURGE_ORDER_CHILD_FIRST = [
 ]
 
 def purge_all(purge_users: bool = False):
-    with get_conn() as conn:
-        conn.execute("PRAGMA foreign_keys=OFF;")
-        cur = conn.cursor()
-        for t in PURGE_ORDER_CHILD_FIRST:
-            cur.execute(f"DELETE FROM {t};")
-        if purge_users:
-            cur.execute("DELETE FROM users;")
-        conn.commit()
-        conn.execute("PRAGMA foreign_keys=ON;")
+    # One script, one transaction; foreign_keys can only be toggled outside it
+    tables = PURGE_ORDER_CHILD_FIRST + (["users"] if purge_users else [])
+    names = ", ".join(f"'{t}'" for t in tables)
+    conn = get_conn()
+    conn.executescript(
+        "PRAGMA foreign_keys=OFF;\nBEGIN;\n"
+        + "".join(f"DELETE FROM {t};\n" for t in tables)
+        + f"DELETE FROM sqlite_sequence WHERE name IN ({names});\n"
+        + "COMMIT;\nPRAGMA foreign_keys=ON;"
+    )
 
 # ---------- Helpers ----------
 def ensure_school(name: str, state: str, district: str):
-    insert_school(name, state=state, district=district, address=None)
-    with get_conn() as conn:
-        cur = conn.execute("SELECT * FROM schools WHERE name = ? AND is_active = 1", (name,))
-        return cur.fetchone()
+    return insert_school_returning(name, state=state, district=district, address=None)
 
 def ensure_classes_sections(school_id: int):
-    existing = {c["name"] for c in list_classes_by_school(school_id)}
-    for cname in CLASS_NAMES:
-        if cname not in existing:
-            insert_class(school_id, cname)
-    for c in list_classes_by_school(school_id):
-        secs = {s["name"] for s in list_sections_by_class(c["id"])}
-        if SECTION_NAME not in secs:
-            insert_section(c["id"], SECTION_NAME)
+    """
+    One class+sections query per school instead of one sections query per class;
+    missing classes, then missing Section A rows, go in with one executemany each.
+    """
+    rows = list_classes_with_sections_by_school(school_id)
+    existing = {r["class_name"] for r in rows}
+    missing = [(school_id, cname) for cname in CLASS_NAMES if cname not in existing]
+    with get_conn() as conn:
+        if missing:
+            conn.executemany("INSERT OR IGNORE INTO classes (school_id, name) VALUES (?,?)", missing)
+            rows = list_classes_with_sections_by_school(school_id)  # pick up the new class ids
+        secs = defaultdict(set)
+        for r in rows:
+            secs[r["class_id"]].add(r["section_name"])
+        conn.executemany(
+            "INSERT OR IGNORE INTO sections (class_id, name) VALUES (?,?)",
+            [(cid, SECTION_NAME) for cid, names in secs.items() if SECTION_NAME not in names],
+        )
 
 def ensure_subjects_for_school(school_id: int):
     current = {s["name"].lower() for s in list_subjects_by_school(school_id)}
@@ -140,119 +149,161 @@ def ensure_subjects_for_school(school_id: int):
         for sub in subjects_for_class(cname):
             if sub.lower() not in current:
                 needed.add(sub)
-    for sub in sorted(needed):
-        insert_subject(school_id, sub)
+    if needed:
+        with get_conn() as conn:
+            conn.executemany("INSERT OR IGNORE INTO subjects (school_id, name) VALUES (?,?)",
+                             [(school_id, sub) for sub in sorted(needed)])
 
 def ensure_periods(school_id: int, total_periods: int):
     have = list_periods_by_school(school_id)
     if len(have) >= total_periods:
         return
     start = datetime.strptime("08:30", "%H:%M")
+    rows = []
     for i in range(1, total_periods + 1):
         pstart = start + timedelta(minutes=(i-1)*45)  # 40m + 5m gap
         pend   = pstart + timedelta(minutes=40)
-        insert_period(school_id, f"Period {i}", pstart.strftime("%H:%M"), pend.strftime("%H:%M"), i)
+        rows.append((school_id, f"Period {i}", pstart.strftime("%H:%M"), pend.strftime("%H:%M"), i))
+    with get_conn() as conn:
+        conn.executemany("""
+            INSERT OR IGNORE INTO periods (school_id, name, start_time, end_time, sort_order)
+            VALUES (?,?,?,?,?)
+        """, rows)
 
 def make_email(base: str, idx: int) -> str:
     return f"{base}{idx:03d}@school.in"
 
-def seed_teachers_across_schools(schools: list, total_teachers: int):
+def seed_teachers_across_schools(schools: list, total_teachers: int) -> int:
     """
     Distribute roughly evenly: >=1 per school, rest round-robin.
-    Use lastrowid to avoid extra SELECTs.
+    Names/phones are sampled in one batch and inserted with a single executemany.
     """
-    created = []
-    idx = 1
+    n = max(total_teachers, len(schools))
+    school_ids = islice(cycle([s["id"] for s in schools]), n)
+    first = random.choices(FIRST_NAMES, k=n)
+    last = random.choices(LAST_NAMES, k=n)
+    phones = [f"+91{random.randrange(7_000_000_000, 10_000_000_000)}" for _ in range(n)]
+    rows = [
+        (sid, f"{fn} {ln}", make_email("teacher", idx), phone)
+        for idx, (sid, fn, ln, phone) in enumerate(zip(school_ids, first, last, phones), start=1)
+    ]
     with get_conn() as conn:
-        cur = conn.cursor()
-        # baseline one per school
-        for s in schools:
-            name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
-            email = make_email("teacher", idx)
-            phone = f"+91{random.randint(7000000000, 9999999999)}"
-            try:
-                cur.execute(
-                    "INSERT INTO teachers (school_id, name, email, phone) VALUES (?,?,?,?)",
-                    (s["id"], name, email, phone)
-                )
-                created.append((cur.lastrowid, s["id"]))
-            except Exception:
-                pass
-            idx += 1
-        # remaining, round-robin
-        remaining = max(0, total_teachers - len(created))
-        si = 0
-        for _ in range(remaining):
-            s = schools[si % len(schools)]
-            name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
-            email = make_email("teacher", idx)
-            phone = f"+91{random.randint(7000000000, 9999999999)}"
-            try:
-                cur.execute(
-                    "INSERT INTO teachers (school_id, name, email, phone) VALUES (?,?,?,?)",
-                    (s["id"], name, email, phone)
-                )
-                created.append((cur.lastrowid, s["id"]))
-            except Exception:
-                pass
-            idx += 1
-            si += 1
-        conn.commit()
-    return created  # [(teacher_id, school_id), ...]
+        cur = conn.executemany(
+            "INSERT OR IGNORE INTO teachers (school_id, name, email, phone) VALUES (?,?,?,?)",
+            rows
+        )
+    return cur.rowcount
+
+@lru_cache(maxsize=None)
+def _teacher_default_hash() -> str:
+    # pbkdf2 is deliberately slow; hash the default password once per process
+    return generate_password_hash("Teacher@123")
 
 def ensure_teacher_logins():
+    # Anti-join: only teachers without a users row, then one batched insert
     with get_conn() as conn:
-        rows = conn.execute("SELECT email FROM teachers WHERE is_active = 1").fetchall()
-    pwd_hash = generate_password_hash("Teacher@123")
-    for r in rows:
-        email = r["email"]
-        if not get_user_by_login(email):
-            insert_user(email, pwd_hash, "Teacher")
-
-def seed_assignments_for_school(school_id: int):
+        missing = conn.execute("""
+            SELECT t.email FROM teachers t
+            LEFT JOIN users u ON u.login_id = t.email
+            WHERE t.is_active = 1 AND u.login_id IS NULL
+        """).fetchall()
+        if not missing:
+            return
+        pwd_hash = _teacher_default_hash()
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (login_id, password_hash, role) VALUES (?,?,'Teacher')",
+            [(r["email"], pwd_hash) for r in missing],
+        )
+
+def section_a_by_class(school_id: int):
+    """
+    Section A of every active class as (class_id, class_name, section_id) tuples,
+    in list_classes_by_school order. main() fetches this once per school and
+    hands it to the seeders below.
+    """
+    cur = get_conn().execute("""
+        SELECT c.id AS class_id, c.name, sec.id AS section_id
+        FROM classes c
+        JOIN sections sec ON sec.class_id = c.id AND sec.name = ? AND sec.is_active = 1
+        WHERE c.school_id = ? AND c.is_active = 1
+        ORDER BY c.sort_key, c.name COLLATE NOCASE
+    """, (SECTION_NAME, school_id))
+    cur.row_factory = None
+    return cur.fetchall()
+
+def seed_assignments_for_school(school_id: int, class_secs: list | None = None):
     """
     Round-robin teachers across class/section subjects.
     Uses fewer commits by batching within a connection.
     """
+    if class_secs is None:
+        class_secs = section_a_by_class(school_id)
     with get_conn() as conn:
-        teacher_rows = conn.execute(
+        cur = conn.execute(
             "SELECT id FROM teachers WHERE school_id = ? AND is_active = 1 ORDER BY id",
             (school_id,)
-        ).fetchall()
-        if not teacher_rows:
+        )
+        cur.row_factory = None  # bare tuples: these rows are only unpacked
+        teacher_ids = [tid for (tid,) in cur.fetchall()]
+        if not teacher_ids:
             return 0
-        teacher_ids = [r["id"] for r in teacher_rows]
 
         subs = list_subjects_by_school(school_id)
         subs_by_name = {s["name"]: s["id"] for s in subs}
 
-        classes = list_classes_by_school(school_id)
-        assigned = 0
+        rows = []
         ti = 0
-        cur = conn.cursor()
-        for c in classes:
-            class_subs = subjects_for_class(c["name"])
-            secs = list_sections_by_class(c["id"])
-            secA = next((s for s in secs if s["name"] == "A"), None)
-            if not secA:
-                continue
-            for sub_name in class_subs:
+        for class_id, class_name, section_id in class_secs:
+            for sub_name in subjects_for_class(class_name):
                 sub_id = subs_by_name.get(sub_name)
                 if not sub_id:
                     continue
-                teacher_id = teacher_ids[ti % len(teacher_ids)]
+                rows.append((school_id, teacher_ids[ti % len(teacher_ids)], sub_id,
+                             class_id, section_id))
                 ti += 1
-                try:
-                    cur.execute("""
-                        INSERT INTO teacher_assignments (school_id, teacher_id, subject_id, class_id, section_id)
-                        VALUES (?,?,?,?,?)
-                    """, (school_id, teacher_id, sub_id, c["id"], secA["id"]))
-                    assigned += 1
-                except Exception:
-                    pass
-        conn.commit()
+        cur = conn.executemany("""
+            INSERT OR IGNORE INTO teacher_assignments (school_id, teacher_id, subject_id, class_id, section_id)
+            VALUES (?,?,?,?,?)
+        """, rows)
+        assigned = cur.rowcount
     return assigned
 
+@contextmanager
+def deferred_indexes(*tables: str):
+    """
+    Drop the secondary indexes on `tables` for the duration of a bulk load and
+    rebuild them afterwards, so each insert only maintains the UNIQUE
+    constraint indexes (those have no sql in sqlite_master and are kept, since
+    INSERT OR IGNORE relies on them). Runs inside the caller's transaction.
+    """
+    conn = get_conn()
+    marks = ",".join("?" * len(tables))
+    saved = conn.execute(f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({marks})
+    """, tables).fetchall()
+    for name, _ in saved:
+        conn.execute(f"DROP INDEX {name}")
+    try:
+        yield
+    finally:
+        for _, sql in saved:
+            conn.execute(sql)
+
+INSERT_CHUNK = 1000  # rows per executemany call
+
+def chunked_executemany(conn, sql: str, rows, chunk: int = INSERT_CHUNK) -> int:
+    """
+    executemany over `rows` in slices of `chunk`, all inside the caller's
+    transaction; keeps the bound parameter list (and peak memory) small.
+    Returns the total rowcount.
+    """
+    it = iter(rows)
+    total = 0
+    while batch := list(islice(it, chunk)):
+        total += conn.executemany(sql, batch).rowcount
+    return total
+
 def daterange(start: date, days: int):
     for i in range(days):
         yield start + timedelta(days=i)
@@ -260,7 +311,12 @@ def daterange(start: date, days: int):
 def is_sunday(d: date) -> bool:
     return d.weekday() == 6
 
-def build_timetable_fast(school_id: int, days: int, periods_per_day: int = 8):
+def school_days(days: int) -> list:
+    # The next `days` dates minus Sundays, as 'YYYY-MM-DD'; same for every school
+    return [d.isoformat() for d in daterange(date.today(), days) if not is_sunday(d)]
+
+def build_timetable_fast(school_id: int, days: int, periods_per_day: int = 8,
+                         class_secs: list | None = None, dates: list | None = None):
     """
     For next `days` (Mon–Sat only), create entries for Section A of each class
     using first N periods/day. Batches inserts for speed.
@@ -268,87 +324,88 @@ def build_timetable_fast(school_id: int, days: int, periods_per_day: int = 8):
     periods = sorted(list_periods_by_school(school_id), key=lambda p: (p["sort_order"], p["name"]))[:periods_per_day]
     if not periods:
         return 0
-    classes = list_classes_by_school(school_id)
+    if class_secs is None:
+        class_secs = section_a_by_class(school_id)
+    if dates is None:
+        dates = school_days(days)
 
     with get_conn() as conn:
-        rows = conn.execute("""
+        cur = conn.execute("""
             SELECT ta.class_id, ta.section_id, ta.subject_id, ta.teacher_id
             FROM teacher_assignments ta
             WHERE ta.school_id = ? AND ta.is_active = 1
             ORDER BY ta.class_id, ta.section_id, ta.subject_id
-        """, (school_id,)).fetchall()
-        teachers = [r["id"] for r in conn.execute(
-            "SELECT id FROM teachers WHERE school_id = ? AND is_active = 1 ORDER BY id", (school_id,)
-        ).fetchall()]
-        subjects = [r["id"] for r in conn.execute(
-            "SELECT id FROM subjects WHERE school_id = ? AND is_active = 1 ORDER BY name", (school_id,)
-        ).fetchall()]
-
-        assignment_map = {}
-        for r in rows:
-            key = (r["class_id"], r["section_id"])
-            assignment_map.setdefault(key, []).append((r["subject_id"], r["teacher_id"]))
-
-        cur = conn.cursor()
-        created = 0
-        today = date.today()
-        for d in daterange(today, days):
-            if is_sunday(d):
+        """, (school_id,))
+        cur.row_factory = None  # bare tuples: unpacked straight into the map
+
+        # (class_id, section_id) -> ((subject_id, teacher_id), ...), cycled across periods;
+        # rows arrive sorted by that key, so groupby splits them without hashing each row
+        assignment_map = {
+            key: tuple((subject_id, teacher_id) for _, _, subject_id, teacher_id in grp)
+            for key, grp in groupby(cur, key=itemgetter(0, 1))
+        }
+
+        # A day's cells don't depend on the date: build them once, stamp each day onto them
+        period_ids = [p["id"] for p in periods]
+        day_cells = []
+        add_cell = day_cells.append
+        for class_id, _, section_id in class_secs:
+            rotation = assignment_map.get((class_id, section_id))
+            if not rotation:
                 continue
-            di = d.isoformat()
-            for c in classes:
-                secs = list_sections_by_class(c["id"])
-                secA = next((s for s in secs if s["name"] == "A"), None)
-                if not secA:
-                    continue
-                key = (c["id"], secA["id"])
-                rotation = assignment_map.get(key, [])
-                rot_len = len(rotation) if rotation else 0
-                for pi, p in enumerate(periods):
-                    if rotation:
-                        subj_id, teach_id = rotation[(pi) % rot_len]
-                    else:
-                        subj_id = subjects[(c["id"] + pi) % len(subjects)]
-                        teach_id = teachers[(c["id"] + pi) % len(teachers)]
-                    try:
-                        cur.execute("""
-                            INSERT INTO timetable_entries
-                              (school_id, date, period_id, class_id, section_id, subject_id, teacher_id)
-                            VALUES (?,?,?,?,?,?,?)
-                        """, (school_id, di, p["id"], c["id"], secA["id"], subj_id, teach_id))
-                        created += 1
-                    except Exception:
-                        pass
-        conn.commit()
+            rot_len = len(rotation)
+            for pi, period_id in enumerate(period_ids):
+                subj_id, teach_id = rotation[pi % rot_len]
+                add_cell((period_id, class_id, section_id, subj_id, teach_id))
+
+        # Stage the dates and one day's cells in temp tables and let SQLite build the
+        # dates x cells product: no Python work per timetable row. Plain execute, not
+        # executescript, so the caller's transaction stays open.
+        for sql in (
+            "DROP TABLE IF EXISTS temp._tt_dates",
+            "DROP TABLE IF EXISTS temp._tt_cells",
+            "CREATE TEMP TABLE _tt_dates (date TEXT)",
+            """CREATE TEMP TABLE _tt_cells
+                 (period_id INTEGER, class_id INTEGER, section_id INTEGER,
+                  subject_id INTEGER, teacher_id INTEGER)""",
+        ):
+            conn.execute(sql)
+        conn.executemany("INSERT INTO _tt_dates (date) VALUES (?)", [(di,) for di in dates])
+        conn.executemany("INSERT INTO _tt_cells VALUES (?,?,?,?,?)", day_cells)
+
+        # OR IGNORE skips slots that already exist; ORDER BY keeps date-major insert order
+        created = conn.execute("""
+            INSERT OR IGNORE INTO timetable_entries
+              (school_id, date, period_id, class_id, section_id, subject_id, teacher_id)
+            SELECT ?, d.date, c.period_id, c.class_id, c.section_id, c.subject_id, c.teacher_id
+            FROM _tt_dates d CROSS JOIN _tt_cells c
+            ORDER BY d.rowid, c.rowid
+        """, (school_id,)).rowcount
     return created
 
-def seed_students_one_section_per_class(school_id: int, students_per_section: int):
+def seed_students_one_section_per_class(school_id: int, students_per_section: int,
+                                        class_secs: list | None = None):
     """
     Create limited students for Section A of each class. Names are synthetic.
     Roll numbers auto 1..N; admission_no = S<school>-C<class>-<roll>.
     """
-    created = 0
+    if class_secs is None:
+        class_secs = section_a_by_class(school_id)
+    # Draw every name in one batch, like seed_teachers_across_schools
+    total = len(class_secs) * students_per_section
+    names = (f"{fn} {ln}" for fn, ln in zip(random.choices(FIRST_NAMES, k=total),
+                                            random.choices(LAST_NAMES, k=total)))
+    rows = [
+        (school_id, class_id, section_id, next(names), rn, f"S{school_id}-C{class_id}-{rn:03d}")
+        for class_id, _, section_id in class_secs
+        for rn in range(1, students_per_section + 1)
+    ]
     with get_conn() as conn:
-        cur = conn.cursor()
-        classes = list_classes_by_school(school_id)
-        for c in classes:
-            secs = list_sections_by_class(c["id"])
-            secA = next((s for s in secs if s["name"] == "A"), None)
-            if not secA:
-                continue
-            for rn in range(1, students_per_section + 1):
-                name = f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)}"
-                admission_no = f"S{school_id}-C{c['id']}-{rn:03d}"
-                try:
-                    cur.execute("""
-                        INSERT INTO students
-                          (school_id, class_id, section_id, name, roll_no, admission_no)
-                        VALUES (?,?,?,?,?,?)
-                    """, (school_id, c["id"], secA["id"], name, rn, admission_no))
-                    created += 1
-                except Exception:
-                    pass
-        conn.commit()
+        created = chunked_executemany(conn, """
+            INSERT OR IGNORE INTO students
+              (school_id, class_id, section_id, name, roll_no, admission_no)
+            VALUES (?,?,?,?,?,?)
+        """, rows)
     return created
 
 # ---------- Main ----------
@@ -373,53 +430,62 @@ def main():
         purge_all(purge_users=args.purge_users)
         print("✔ Purge complete.")
 
-    # 1) Create up to N schools
-    print("→ Creating schools…")
-    schools = []
-    for i in range(args.schools):
-        state, city = STATE_CITY[i % len(STATE_CITY)]
-        name = f"Government High School, {city} #{(i//len(STATE_CITY))+1}"
-        srow = ensure_school(name, state, city)
-        schools.append(srow)
-    print(f"✔ Schools ready: {len(schools)}")
-
-    # 2) Per school: classes/section A, subjects, periods (batched)
-    print("→ Ensuring classes, sections, subjects, periods…")
-    for s in schools:
-        ensure_classes_sections(s["id"])
-        ensure_subjects_for_school(s["id"])
-        ensure_periods(s["id"], args.periods)
-    print("✔ Structure ensured per school.")
-
-    # 3) Teachers (distributed)
-    print("→ Seeding teachers across schools…")
-    created_teachers = seed_teachers_across_schools(schools, args.teachers)
-    print(f"✔ Teachers distributed: target={args.teachers}, created_at_least={len(created_teachers)}")
-
-    if args.create_teacher_logins:
-        ensure_teacher_logins()
-        print("✔ Teacher logins created where missing (password: Teacher@123)")
-
-    # 4) Assignments per school
-    print("→ Creating teacher assignments…")
-    total_assigned = 0
-    for s in schools:
-        total_assigned += seed_assignments_for_school(s["id"])
-    print(f"✔ Teacher assignments created: ~{total_assigned}")
-
-    # 5) Students (limited, Section A only)
-    print(f"→ Creating students (Section A only, {args.students_per_section} per class)…")
-    total_students = 0
-    for s in schools:
-        total_students += seed_students_one_section_per_class(s["id"], args.students_per_section)
-    print(f"✔ Students created: {total_students}")
-
-    # 6) Timetable (Mon–Sat, limited days + periods)
-    print(f"→ Building {args.days}-day timetable (Mon–Sat) with {args.periods} periods/day…")
-    total_tt = 0
-    for s in schools:
-        total_tt += build_timetable_fast(s["id"], days=args.days, periods_per_day=args.periods)
-    print(f"✔ Timetable entries created: {total_tt}")
+    # Everything below commits once, at the end of this block
+    with transaction():
+        # 1) Create up to N schools
+        print("→ Creating schools…")
+        schools = []
+        for i in range(args.schools):
+            state, city = STATE_CITY[i % len(STATE_CITY)]
+            name = f"Government High School, {city} #{(i//len(STATE_CITY))+1}"
+            srow = ensure_school(name, state, city)
+            schools.append(srow)
+        print(f"✔ Schools ready: {len(schools)}")
+
+        # 2) Per school: classes/section A, subjects, periods (batched)
+        print("→ Ensuring classes, sections, subjects, periods…")
+        for s in schools:
+            ensure_classes_sections(s["id"])
+            ensure_subjects_for_school(s["id"])
+            ensure_periods(s["id"], args.periods)
+        # Section A per class, fetched once and shared by steps 4-6
+        class_secs = {s["id"]: section_a_by_class(s["id"]) for s in schools}
+        print("✔ Structure ensured per school.")
+
+        # 3) Teachers (distributed)
+        print("→ Seeding teachers across schools…")
+        created_teachers = seed_teachers_across_schools(schools, args.teachers)
+        print(f"✔ Teachers distributed: target={args.teachers}, created_at_least={created_teachers}")
+
+        if args.create_teacher_logins:
+            ensure_teacher_logins()
+            print("✔ Teacher logins created where missing (password: Teacher@123)")
+
+        # 4) Assignments per school
+        print("→ Creating teacher assignments…")
+        total_assigned = 0
+        for s in schools:
+            total_assigned += seed_assignments_for_school(s["id"], class_secs[s["id"]])
+        print(f"✔ Teacher assignments created: ~{total_assigned}")
+
+        # Steps 5-6 only insert into these tables; rebuild their indexes once at the end
+        with deferred_indexes("students", "timetable_entries"):
+            # 5) Students (limited, Section A only)
+            print(f"→ Creating students (Section A only, {args.students_per_section} per class)…")
+            total_students = 0
+            for s in schools:
+                total_students += seed_students_one_section_per_class(s["id"], args.students_per_section,
+                                                                      class_secs[s["id"]])
+            print(f"✔ Students created: {total_students}")
+
+            # 6) Timetable (Mon–Sat, limited days + periods)
+            print(f"→ Building {args.days}-day timetable (Mon–Sat) with {args.periods} periods/day…")
+            total_tt = 0
+            dates = school_days(args.days)
+            for s in schools:
+                total_tt += build_timetable_fast(s["id"], days=args.days, periods_per_day=args.periods,
+                                                 class_secs=class_secs[s["id"]], dates=dates)
+            print(f"✔ Timetable entries created: {total_tt}")
 
     print("✅ Done.")
 